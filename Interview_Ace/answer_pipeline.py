@@ -0,0 +1,363 @@
+# answer_pipeline.py
+"""Turn a list of sampled questions into question/answer pairs.
+
+Each answer mode is written once, as a generation plan: a generator that
+yields the Gemini requests it needs (GeminiCall for one result, GeminiFanout
+for one response per prompt) and receives their results. answer_questions
+drives a plan with blocking calls, answer_questions_async with awaited ones.
+"""
+import asyncio
+import logging
+import os
+from collections import namedtuple
+
+from answer_store import get_answer_store
+from gemini_api import (
+    get_gemini_result,
+    get_gemini_result_async,
+    get_gemini_responses,
+    get_gemini_responses_async,
+    iter_gemini_responses,
+    stream_gemini_response
+)
+from granite import (
+    format_continuation_prompt,
+    format_json_prompt_for_granite,
+    format_prompt_for_granite,
+    format_single_question_prompt
+)
+from metrics import CACHE_REQUESTS, PARSE_FALLBACKS, in_current_context, stage
+from response_parser import (
+    IncrementalAnswerParser,
+    clean_single_answer,
+    iter_numbered_answers,
+    parse_gemini_response,
+    parse_json_answers
+)
+
+logger = logging.getLogger(__name__)
+
+# "batch" sends all questions in one prompt, "json" does the same but asks for a JSON
+# answer array, "fanout" sends one prompt per question concurrently
+ANSWER_MODE = os.getenv("ANSWER_MODE", "batch").lower()
+# Follow-up requests for answers missing from a JSON response
+JSON_MAX_REPAIRS = int(os.getenv("JSON_MAX_REPAIRS", "2"))
+# Follow-up requests for the questions a response cut off at max_output_tokens never reached
+MAX_CONTINUATIONS = int(os.getenv("MAX_CONTINUATIONS", "2"))
+
+GENERATION_FAILED_ANSWER = "Answer not available right now. Please try again later."
+PARSING_FAILED_ANSWER = "Answer not available due to parsing error."
+
+# What a generation plan asks its driver for: a GeminiResult, or one response text (or None) per prompt.
+# cacheable(result) tells whether the plan can use a fresh result; only usable ones are cached, and
+# bypass_cache is set when a plan re-sends a prompt whose earlier result it could not use.
+GeminiCall = namedtuple("GeminiCall", "prompt json_mode bypass_cache cacheable", defaults=(False, False, None))
+GeminiFanout = namedtuple("GeminiFanout", "prompts cacheable", defaults=(None,))
+
+
+def _answers_any(numbers):
+    """cacheable check: the response has a numbered answer for at least one of the numbers"""
+    numbers = set(numbers)
+    return lambda result: any(number in numbers for number, _ in iter_numbered_answers(result.text))
+
+
+def _single_answer_usable(result):
+    return bool(clean_single_answer(result.text))
+
+
+def _complete_answers(result, numbers):
+    """Numbered answers of a result for the given numbers, minus one cut off mid-sentence"""
+    pairs = iter_numbered_answers(result.text)
+    if result.truncated and pairs:
+        pairs = pairs[:-1]
+    answers = {}
+    for number, answer in pairs:
+        if number in numbers:
+            answers.setdefault(number, answer)
+    return answers
+
+
+def _batch_plan(role, level, questions):
+    """Answer all questions with a single numbered prompt.
+
+    If Gemini stops at max_output_tokens, follow-up prompts ask for only the
+    unanswered question numbers instead of repeating the whole generation.
+    """
+    numbers = range(1, len(questions) + 1)
+    result = yield GeminiCall(format_prompt_for_granite(role, level, questions), cacheable=_answers_any(numbers))
+    if not result.truncated:
+        with stage("parse_answers"):
+            parsed = parse_gemini_response(result.text, questions)
+        return {item["question"]: item["answer"] for item in parsed}
+    return (yield from _continuation_plan(role, level, questions, result))
+
+
+def _numbered_plan(role, level, questions):
+    """Like _batch_plan, but without the positional fallbacks of parse_gemini_response.
+
+    Only answers matched by their number are kept and an answer cut off at
+    max_output_tokens is asked for again, so nothing can land on the wrong
+    question or be kept half-finished. Questions left over are missing from
+    the result.
+    """
+    numbers = range(1, len(questions) + 1)
+    result = yield GeminiCall(format_prompt_for_granite(role, level, questions), cacheable=_answers_any(numbers))
+    return (yield from _continuation_plan(role, level, questions, result))
+
+
+def _continuation_plan(role, level, questions, result):
+    """Numbered answers of result, plus continuations for the questions it did not complete"""
+    numbered = dict(enumerate(questions, 1))
+    with stage("parse_answers"):
+        answers = _complete_answers(result, numbered)
+    sent = set()
+    for _ in range(MAX_CONTINUATIONS):
+        pending = [n for n in numbered if n not in answers]
+        if not pending or not result.truncated:
+            break
+        logger.warning(f"Response truncated; requesting the {len(pending)} unanswered questions")
+        prompt = format_continuation_prompt(role, level, [(n, numbered[n]) for n in pending])
+        result = yield GeminiCall(prompt, bypass_cache=prompt in sent, cacheable=_answers_any(pending))
+        sent.add(prompt)
+        with stage("parse_answers"):
+            answers.update(_complete_answers(result, set(pending)))
+
+    missing = len(questions) - len(answers)
+    if missing:
+        logger.warning(f"{missing} questions still unanswered after continuation")
+    return {numbered[n]: answer for n, answer in answers.items()}
+
+
+def _json_response_answers(text, pending):
+    """(answers, from_prose): JSON answers for the pending numbers, else numbered prose ones"""
+    parsed = parse_json_answers(text, pending)
+    if parsed:
+        return parsed, False
+    return {n: a for n, a in iter_numbered_answers(text) if n in pending}, True
+
+
+def _json_plan(role, level, questions):
+    """Answer all questions with one JSON prompt, re-requesting only invalid or missing answers.
+
+    Questions keep their original numbers in every request. If the model
+    ignores the JSON instructions and answers in numbered prose, those
+    answers are used for the questions still pending.
+    """
+    numbered = dict(enumerate(questions, 1))
+    answers = {}
+    sent = set()
+    for attempt in range(JSON_MAX_REPAIRS + 1):
+        pending = [i for i in numbered if i not in answers]
+        if not pending:
+            break
+        if attempt:
+            logger.warning(f"JSON answers missing for {len(pending)} questions, re-requesting them")
+        prompt = format_json_prompt_for_granite(role, level, [(i, numbered[i]) for i in pending])
+        result = yield GeminiCall(
+            prompt, json_mode=True, bypass_cache=prompt in sent,
+            cacheable=lambda result, pending=pending: bool(_json_response_answers(result.text, pending)[0])
+        )
+        sent.add(prompt)
+        with stage("parse_answers"):
+            parsed, from_prose = _json_response_answers(result.text, pending)
+            if parsed and from_prose:
+                PARSE_FALLBACKS.inc(parser="json", fallback="numbered_prose")
+        for index, answer in parsed.items():
+            answers.setdefault(index, answer)
+
+    return {numbered[i]: answer for i, answer in answers.items()}
+
+
+def _fanout_plan(role, level, questions):
+    """Answer each question with its own prompt, concurrently.
+
+    Wall-clock time is the slowest single answer, and a question that fails
+    or times out gets a fallback answer without affecting the others.
+    """
+    prompts = [format_single_question_prompt(role, level, q) for q in questions]
+    responses = yield GeminiFanout(prompts, cacheable=_single_answer_usable)
+
+    answers = {}
+    failed = 0
+    for question, response in zip(questions, responses):
+        answer = clean_single_answer(response) if response is not None else ""
+        if not answer:
+            failed += 1
+            answer = GENERATION_FAILED_ANSWER
+        answers[question] = answer
+
+    if failed == len(questions):
+        raise Exception("Gemini API failed for every question")
+    if failed:
+        logger.warning(f"Fan-out: {failed}/{len(questions)} questions fell back")
+    return answers
+
+
+def _count_store_lookups(hits, misses):
+    logger.info(f"Answer store: {hits} hits, {misses} misses")
+    CACHE_REQUESTS.inc(hits, cache="answer_store", result="hit")
+    CACHE_REQUESTS.inc(misses, cache="answer_store", result="miss")
+
+
+def _generation_plan(role, level, questions):
+    if ANSWER_MODE == "fanout":
+        return _fanout_plan(role, level, questions)
+    if ANSWER_MODE == "json":
+        return _json_plan(role, level, questions)
+    return _batch_plan(role, level, questions)
+
+
+def _run_plan(plan, bypass_cache=False):
+    """Drive a generation plan with blocking Gemini calls; returns the plan's answers"""
+    try:
+        request = next(plan)
+        while True:
+            if isinstance(request, GeminiFanout):
+                request = plan.send(get_gemini_responses(request.prompts, cacheable=request.cacheable))
+            else:
+                request = plan.send(get_gemini_result(
+                    request.prompt, request.json_mode, bypass_cache or request.bypass_cache, request.cacheable
+                ))
+    except StopIteration as done:
+        return done.value
+
+
+async def _run_plan_async(plan):
+    """Drive a generation plan with awaited Gemini calls; returns the plan's answers"""
+    try:
+        request = next(plan)
+        while True:
+            if isinstance(request, GeminiFanout):
+                request = plan.send(await get_gemini_responses_async(request.prompts, cacheable=request.cacheable))
+            else:
+                request = plan.send(await get_gemini_result_async(
+                    request.prompt, request.json_mode, request.bypass_cache, request.cacheable
+                ))
+    except StopIteration as done:
+        return done.value
+
+
+def _stored_answers(role, level, questions):
+    """({question: answer} from the store, [questions still to generate])"""
+    answers = get_answer_store().lookup(role, level, questions)
+    missing = [q for q in questions if q not in answers]
+    _count_store_lookups(len(questions) - len(missing), len(missing))
+    return answers, missing
+
+
+def _answer_list(questions, answers, generated):
+    for question, answer in generated.items():
+        answers.setdefault(question, answer)
+    return [
+        {"question": q, "answer": answers.get(q, PARSING_FAILED_ANSWER)}
+        for q in questions
+    ]
+
+
+def answer_questions(role, level, questions):
+    """Serve pre-generated answers from the store and ask Gemini only for the misses"""
+    answers, missing = _stored_answers(role, level, questions)
+    generated = {}
+    if missing:
+        with stage("generate_answers"):
+            generated = _run_plan(_generation_plan(role, level, missing))
+    return _answer_list(questions, answers, generated)
+
+
+def generate_numbered_answers(role, level, questions, bypass_cache=False):
+    """{question: answer} for the questions Gemini answered completely and under their own number.
+
+    Used to build the answer store, where a misplaced or cut-off answer
+    would be served for good; unanswered questions are simply left out.
+    """
+    return _run_plan(_numbered_plan(role, level, questions), bypass_cache)
+
+
+async def _default_offload(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, in_current_context(fn, *args))
+
+
+async def answer_questions_async(role, level, questions, offload=None):
+    """answer_questions for the event loop: Gemini calls are awaited, not blocking.
+
+    The answer store lookup may stat and read files, so it runs through
+    offload(fn, *args), a coroutine that awaits fn on a thread pool
+    (asgi.offload); by default the loop's default executor is used.
+    """
+    answers, missing = await (offload or _default_offload)(_stored_answers, role, level, questions)
+    generated = {}
+    if missing:
+        with stage("generate_answers"):
+            generated = await _run_plan_async(_generation_plan(role, level, missing))
+    return _answer_list(questions, answers, generated)
+
+
+def _stream_batch(role, level, questions):
+    """Yield (position, answer) as numbered answers complete in a streamed response"""
+    parser = IncrementalAnswerParser()
+    answered = set()
+
+    def accept(results):
+        for number, answer in results:
+            position = number - 1
+            if 0 <= position < len(questions) and position not in answered:
+                answered.add(position)
+                yield position, answer
+
+    try:
+        for chunk in stream_gemini_response(format_prompt_for_granite(role, level, questions)):
+            yield from accept(parser.feed(chunk))
+        yield from accept(parser.close())
+    except Exception as e:
+        logger.error(f"Streaming generation failed: {e}")
+        for position in range(len(questions)):
+            if position not in answered:
+                yield position, GENERATION_FAILED_ANSWER
+        return
+
+    if len(answered) < len(questions):
+        # Same fallbacks as the non-streaming path for whatever did not parse incrementally
+        for position, item in enumerate(parse_gemini_response(parser.text, questions)):
+            if position not in answered:
+                answered.add(position)
+                yield position, item["answer"]
+
+
+def _stream_fanout(role, level, questions):
+    """Yield (position, answer) as individual per-question prompts finish"""
+    prompts = [format_single_question_prompt(role, level, q) for q in questions]
+    for position, response in iter_gemini_responses(prompts, cacheable=_single_answer_usable):
+        answer = clean_single_answer(response) if response is not None else ""
+        yield position, answer or GENERATION_FAILED_ANSWER
+
+
+def stream_answers(role, level, questions):
+    """Yield {"index", "question", "answer"} dicts as soon as each answer is available.
+
+    Stored answers are yielded immediately; the rest follow as Gemini
+    generates them, so the first answers reach the user long before the
+    whole set is done.
+    """
+    stored = get_answer_store().lookup(role, level, questions)
+    missing = []
+    for index, question in enumerate(questions):
+        if question in stored:
+            yield {"index": index, "question": question, "answer": stored[question]}
+        else:
+            missing.append(index)
+    _count_store_lookups(len(questions) - len(missing), len(missing))
+    if not missing:
+        return
+
+    missing_questions = [questions[i] for i in missing]
+    # JSON mode streams numbered prose: a partial JSON array cannot be parsed answer by answer
+    stream = _stream_fanout if ANSWER_MODE == "fanout" else _stream_batch
+    seen = set()
+    for position, answer in stream(role, level, missing_questions):
+        seen.add(position)
+        index = missing[position]
+        yield {"index": index, "question": questions[index], "answer": answer}
+
+    for position, index in enumerate(missing):
+        if position not in seen:
+            yield {"index": index, "question": questions[index], "answer": PARSING_FAILED_ANSWER}
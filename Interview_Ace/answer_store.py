@@ -0,0 +1,249 @@
+# answer_store.py
+"""Versioned store of pre-generated model answers for the question bank.
+
+The bank is finite, so answers are generated offline by running this module
+as a script and served from the store on the request path. Each run writes a
+new immutable ``answers-v<N>.json`` file and then atomically repoints
+``CURRENT`` at it, so running workers pick the new version up on their next
+lookup without a restart.
+
+    python answer_store.py                 # generate with the real Gemini API
+    python answer_store.py --fake          # offline run against fake_gemini.py
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+import gemini_api
+
+logger = logging.getLogger(__name__)
+
+ANSWER_STORE_DIR = os.getenv("ANSWER_STORE_DIR", "answer_store")
+CURRENT_POINTER = "CURRENT"
+
+
+def answer_key(role, level, question):
+    """Stable key for one (role, level, question) triple"""
+    raw = "\x1f".join(part.strip().lower() for part in (role, level, question))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def read_current(directory):
+    """The current store version (metadata and answers) of a directory, or None if there is none"""
+    try:
+        with open(os.path.join(directory, CURRENT_POINTER), "r") as f:
+            filename = f.read().strip()
+    except FileNotFoundError:
+        return None
+    with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class AnswerStore:
+    """Read side of the answer store, reloaded when CURRENT changes.
+
+    Only a store generated by the running Gemini backend is served, so a
+    --fake build never answers users of the real model (or the other way round).
+    """
+
+    def __init__(self, directory=ANSWER_STORE_DIR, backend=None):
+        self.directory = directory
+        # None: whatever gemini_api.GEMINI_BACKEND is when the store is loaded
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._answers = {}
+        self.version = None
+
+    def _pointer_path(self):
+        return os.path.join(self.directory, CURRENT_POINTER)
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self._pointer_path())
+        except FileNotFoundError:
+            return self._answers
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return self._answers
+
+        with self._lock:
+            if stamp == self._stamp:
+                return self._answers
+            try:
+                data = read_current(self.directory) or {}
+                backend = self.backend or gemini_api.GEMINI_BACKEND
+                if data.get("backend") != backend:
+                    logger.error(
+                        f"Answer store v{data.get('version')} was generated by the "
+                        f"{data.get('backend')} backend, not {backend}; not serving it"
+                    )
+                    self._answers, self.version = {}, None
+                else:
+                    self._answers = data.get("answers", {})
+                    self.version = data.get("version")
+                    logger.info(f"Loaded answer store v{self.version} ({len(self._answers)} answers)")
+            except (OSError, ValueError) as e:
+                # Keep serving the previous version rather than failing requests
+                logger.error(f"Could not load answer store: {e}")
+            self._stamp = stamp
+            return self._answers
+
+    def get(self, role, level, question):
+        return self._refresh().get(answer_key(role, level, question))
+
+    def lookup(self, role, level, questions):
+        """Return {question: answer} for the questions that have a stored answer"""
+        answers = self._refresh()
+        found = {}
+        for question in questions:
+            answer = answers.get(answer_key(role, level, question))
+            if answer:
+                found[question] = answer
+        return found
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_answer_store():
+    """Return the process-wide AnswerStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnswerStore()
+    return _store
+
+
+def _next_version(directory):
+    versions = [0]
+    for name in os.listdir(directory):
+        if name.startswith("answers-v") and name.endswith(".json"):
+            try:
+                versions.append(int(name[len("answers-v"):-len(".json")]))
+            except ValueError:
+                continue
+    return max(versions) + 1
+
+
+def write_store(directory, answers, metadata):
+    """Write a new store version and atomically make it current"""
+    os.makedirs(directory, exist_ok=True)
+    version = _next_version(directory)
+    filename = f"answers-v{version}.json"
+
+    payload = dict(metadata, version=version, answers=answers)
+    tmp_path = os.path.join(directory, filename + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+    pointer_tmp = os.path.join(directory, CURRENT_POINTER + ".tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(filename)
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_POINTER))
+    return version
+
+
+def generate_answers(questions_path, directory, batch_size=10, roles=None, reuse=True):
+    """Generate model answers for every question in the bank and store them.
+
+    Answers of the previous version are only carried over when it was
+    generated by the same backend; a partial (roles) rebuild on top of a
+    store from another backend raises ValueError instead.
+    """
+    from answer_pipeline import generate_numbered_answers
+    from granite import get_question_bank
+
+    bank = get_question_bank(questions_path)
+    current = read_current(directory) or {}
+    previous = current.get("answers", {})
+    if previous and current.get("backend") != gemini_api.GEMINI_BACKEND:
+        if roles:
+            raise ValueError(
+                f"The current store was generated by the {current.get('backend')} backend, not "
+                f"{gemini_api.GEMINI_BACKEND}; rebuild every role instead of using --role"
+            )
+        logger.warning(f"Not reusing answers generated by the {current.get('backend')} backend")
+        previous = {}
+    rebuilt = [role for role in bank.roles() if not roles or role in roles]
+    # A partial rebuild publishes a complete store: answers of the other roles carry over as they are
+    rebuilt_keys = {
+        answer_key(role, level, question)
+        for role in rebuilt for level in bank.levels(role) for question in bank.questions(role, level)
+    }
+    answers = {key: answer for key, answer in previous.items() if key not in rebuilt_keys}
+    generated = reused = failed = 0
+
+    for role in rebuilt:
+        for level in bank.levels(role):
+            pending = []
+            for question in bank.questions(role, level):
+                key = answer_key(role, level, question)
+                if reuse and key in previous:
+                    answers[key] = previous[key]
+                    reused += 1
+                else:
+                    pending.append(question)
+
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                try:
+                    # Only answers matched by number and not cut off: a wrong one would be stored for good
+                    batch_answers = generate_numbered_answers(role, level, batch, bypass_cache=not reuse)
+                except Exception as e:
+                    logger.error(f"Generation failed for {role} ({level}): {e}")
+                    failed += len(batch)
+                    continue
+
+                failed += len(batch) - len(batch_answers)
+                for question, answer in batch_answers.items():
+                    answers[answer_key(role, level, question)] = answer
+                    generated += 1
+
+            logger.info(f"{role} ({level}): {len(bank.questions(role, level))} questions")
+
+    metadata = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "model": gemini_api.MODEL_NAME,
+        "backend": gemini_api.GEMINI_BACKEND,
+        "generation_config": gemini_api.GENERATION_CONFIG,
+        "question_bank_sha256": bank.digest,
+    }
+    version = write_store(directory, answers, metadata)
+    return version, generated, reused, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate model answers for the question bank")
+    parser.add_argument("--questions", default="interview_ques.json", help="question bank JSON file")
+    parser.add_argument("--store-dir", default=ANSWER_STORE_DIR, help="answer store directory")
+    parser.add_argument("--batch-size", type=int, default=10, help="questions per Gemini prompt")
+    parser.add_argument("--role", action="append", dest="roles", help="only generate for this role (repeatable)")
+    parser.add_argument("--no-reuse", action="store_true", help="regenerate answers already in the store")
+    parser.add_argument("--fake", action="store_true", help="use the local fake Gemini backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.fake:
+        gemini_api.GEMINI_BACKEND = "fake"
+
+    try:
+        version, generated, reused, failed = generate_answers(
+            args.questions, args.store_dir, args.batch_size, args.roles, reuse=not args.no_reuse
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Wrote answer store v{version}: {generated} generated, {reused} reused, {failed} failed")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
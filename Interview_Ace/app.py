@@ -1,19 +1,29 @@
 # app.py
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, Response, g, request, jsonify, render_template, session, redirect, url_for, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 import os
+import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from resume_parser import extract_resume_info
 from granite import (
+    MAX_SEED,
     get_questions_by_role_and_level,
     get_levels_for_role,
     get_all_roles,
-    format_prompt_for_granite
+    question_seed
 )
-from gemini_api import get_gemini_response
+from answer_pipeline import answer_questions, stream_answers
+from gemini_api import get_gemini_client, get_response_cache_stats, get_singleflight_stats
+from jobs import JobManager, MemoryJobStore, MongoJobStore, job_status
+import metrics
+from metrics import REQUEST_SECONDS, begin_request, current_timings, stage
+from profiler import get_profiler
+from question_search import get_search_index
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
@@ -27,19 +37,52 @@ from pymongo import MongoClient
 # Explicit path to .env inside virtual_env
 load_dotenv(dotenv_path=os.path.join("virtual_env", ".env"))
 
-try:
-    MONGODB_URI = os.getenv("MONGODB_URI")
-    client = MongoClient(MONGODB_URI)
+# "atlas" (MONGODB_URI) or "memory" (per-process stand-in for local load tests)
+MONGO_BACKEND = os.getenv("MONGO_BACKEND", "atlas").lower()
+
+jobs_collection = None
+if MONGO_BACKEND == "memory":
+    from memory_mongo import MemoryMongoClient
+    client = MemoryMongoClient()
     db = client['interview_prep_ai']
     users_collection = db['users']
-    print("✅ Connected to MongoDB Atlas")
-except Exception as e:
-    print(f"❌ MongoDB Atlas connection failed: {e}")
+    print("⚠️ Using in-memory MongoDB stand-in (MONGO_BACKEND=memory)")
+else:
+    try:
+        MONGODB_URI = os.getenv("MONGODB_URI")
+        # Connect on first use, so a preloading gunicorn master never holds sockets its workers inherit
+        client = MongoClient(MONGODB_URI, connect=False)
+        db = client['interview_prep_ai']
+        users_collection = db['users']
+        jobs_collection = db['jobs']
+        print("✅ Connected to MongoDB Atlas")
+    except Exception as e:
+        print(f"❌ MongoDB Atlas connection failed: {e}")
+
+# Job records go to Mongo so any worker can answer the status poll
+job_manager = JobManager(
+    MongoJobStore(jobs_collection) if jobs_collection is not None else MemoryJobStore()
+)
+
+# How index.html asks for results: "stream" (SSE), "job" (background job + polling) or "sync"
+FRONTEND_MODE = os.getenv("FRONTEND_MODE", "stream")
 
 UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
+# Resumes are parsed from memory; keeping a copy on disk is opt-in and happens off the request path
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "0") == "1"
+if PERSIST_UPLOADS:
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+upload_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-writer")
+
+# Per-stage timings in a Server-Timing response header (visible in browser devtools)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# /questions/search pagination
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
 # Allowed file extensions for resume
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
@@ -65,100 +108,97 @@ def validate_resume_file(file):
     
     return True, "Valid file"
 
-def parse_gemini_response(response_text, questions):
-    """Parse Gemini response and match with questions - improved version"""
-    import re
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    
-    if not response_text or not response_text.strip():
-        logger.warning("Empty response from Gemini")
-        return [{"question": q, "answer": "No response generated."} for q in questions]
-    
-    logger.info(f"Parsing response of length {len(response_text)} for {len(questions)} questions")
-    
-    # Clean the response
-    response_text = response_text.strip()
-    
-    # Method 1: Try to parse numbered responses
-    parsed_questions = []
-    
-    # Split by numbered patterns (1., 2., 3., etc.)
-    pattern = r'\n?(\d+)\.\s*'
-    parts = re.split(pattern, response_text)
-    
-    if len(parts) > 2:  # We have numbered sections
-        logger.info(f"Found {(len(parts)-1)//2} numbered sections")
-        
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                question_num = int(parts[i]) - 1  # Convert to 0-based index
-                answer_text = parts[i + 1].strip()
-                
-                # Clean up the answer
-                answer_text = re.sub(r'\*\*.*?\*\*', '', answer_text)  # Remove markdown bold
-                answer_text = re.sub(r'AI Model Answer', '', answer_text)
-                answer_text = re.sub(r'---+', '', answer_text)
-                answer_text = re.sub(r'\n+', ' ', answer_text)  # Replace multiple newlines with space
-                answer_text = answer_text.strip()
-                
-                if question_num < len(questions) and answer_text:
-                    parsed_questions.append({
-                        "question": questions[question_num],
-                        "answer": answer_text
-                    })
-    
-    # Method 2: If Method 1 didn't work well, try alternative parsing
-    if len(parsed_questions) < len(questions) * 0.8:  # If we got less than 80% of questions
-        logger.warning("Method 1 failed, trying alternative parsing")
-        parsed_questions = []
-        
-        # Try splitting by double newlines or other patterns
-        sections = re.split(r'\n\s*\n+', response_text)
-        sections = [s.strip() for s in sections if s.strip()]
-        
-        for i, question in enumerate(questions):
-            if i < len(sections):
-                answer = sections[i]
-                # Clean the answer
-                answer = re.sub(r'^\d+\.\s*', '', answer)  # Remove leading number
-                answer = re.sub(r'\*\*.*?\*\*', '', answer)  # Remove markdown
-                answer = re.sub(r'AI Model Answer', '', answer)
-                answer = answer.strip()
-                
-                if not answer:
-                    answer = "Answer not available."
-            else:
-                answer = "Answer not available."
-            
-            parsed_questions.append({
-                "question": question,
-                "answer": answer
-            })
-    
-    # Method 3: Fallback - ensure we have answers for all questions
-    if len(parsed_questions) != len(questions):
-        logger.warning(f"Mismatch: {len(parsed_questions)} parsed vs {len(questions)} expected")
-        
-        # Fill missing questions
-        for i in range(len(parsed_questions), len(questions)):
-            parsed_questions.append({
-                "question": questions[i],
-                "answer": "Answer not available due to parsing error."
-            })
-        
-        # Trim excess if any
-        parsed_questions = parsed_questions[:len(questions)]
-    
-    logger.info(f"Successfully parsed {len(parsed_questions)} question-answer pairs")
-    return parsed_questions
+def persist_upload(filepath, data):
+    """Write an uploaded resume to disk (runs on the upload writer pool)"""
+    try:
+        with stage("upload_save"), open(filepath, "wb") as f:
+            f.write(data)
+    except OSError as e:
+        app.logger.error(f"Could not persist upload {filepath}: {e}")
+
+def wants_job():
+    """True when the client asked for a background job instead of waiting"""
+    return request.args.get("async") == "1"
+
+def wants_stream():
+    """True when the client asked for answers over Server-Sent Events"""
+    return request.args.get("stream") == "1"
+
+def requested_seed(data=None):
+    """Sampling seed sent by the client as ?seed= or a "seed" field, or None.
+
+    Raises ValueError for anything that is not an integer in [0, MAX_SEED].
+    """
+    value = request.args.get("seed")
+    if value is None and data:
+        value = data.get("seed")
+    if value is None or value == "":
+        return None
+    # JSON may carry lists, objects, floats or booleans, which int() would reject with a TypeError or coerce
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"seed must be an integer, not {type(value).__name__}")
+    seed = int(value)
+    if not 0 <= seed <= MAX_SEED:
+        raise ValueError(f"seed must be between 0 and {MAX_SEED}")
+    return seed
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_questions_response(info, role, level, questions, seed):
+    """Stream the profile first, then each question/answer pair as it is generated"""
+    def generate():
+        yield sse_event("info", {"info": info, "questions": questions, "seed": seed})
+        try:
+            for item in stream_answers(role, level, questions):
+                yield sse_event("answer", item)
+            yield sse_event("done", {"count": len(questions)})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.before_request
+def start_request_timing():
+    begin_request()
+    # Opt-in (PROFILE_SAMPLE_RATE / PROFILE_SLOW_MS); None when this request isn't watched
+    g.profile = get_profiler().begin()
+
+@app.after_request
+def record_request_timing(response):
+    timings = current_timings()
+    if timings is None:
+        return response
+    if SERVER_TIMING:
+        # Streamed responses only show the stages finished before the first byte
+        response.headers["Server-Timing"] = timings.server_timing()
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    method, status = request.method, response.status_code
+    profile = g.pop("profile", None)
+
+    def finish():
+        # Runs once the body (including any stream) has been sent
+        REQUEST_SECONDS.observe(timings.elapsed(), method=method, route=rule, status=status)
+        if profile is not None:
+            get_profiler().finish(profile, method, rule, status, dict(timings.stages))
+
+    response.call_on_close(finish)
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route("/")
 def index():
     if 'user_id' not in session:
         return render_template("auth.html")
-    return render_template("index.html", user=session.get('user_name'))
+    return render_template("index.html", user=session.get('user_name'), frontend_mode=FRONTEND_MODE)
 
 @app.route("/register", methods=["POST"])
 def register():
@@ -230,64 +270,170 @@ def logout():
     session.clear()
     return redirect(url_for('index'))
 
-@app.route("/process-resume", methods=["POST"])
-def process_resume():
-    if 'user_id' not in session:
-        return jsonify({"error": "Please login first"}), 401
+def plan_resume(data, filename, seed=None, user_id=None):
+    """Parse a resume and sample its questions.
+
+    Returns (info, questions, seed, early): when the role/level can't be used
+    as-is, early is the (payload, status) to send back instead. Without an
+    explicit seed one is picked by question_seed.
+    """
+    info = extract_resume_info(data, filename)
     
+    role = info.get("role")
+    level = info.get("level")
+    all_roles = get_all_roles()
+
+    # Check if we need manual input
+    needs_manual = False
+    if not role or role not in all_roles:
+        needs_manual = True
+    else:
+        levels = get_levels_for_role(role)
+        if not level or level not in levels:
+            needs_manual = True
+
+    if needs_manual:
+        return info, None, None, ({
+            "needsManualInput": True,
+            "info": info,
+            "availableRoles": all_roles
+        }, 200)
+
+    # Process automatically
+    if seed is None:
+        seed = question_seed(role, level, user_id)
+    with stage("sample_questions"):
+        questions = get_questions_by_role_and_level(role, level, seed=seed, skills=info.get("skills"))
+    if not questions:
+        return info, None, seed, ({"error": f"No questions found for {role} ({level})"}, 400)
+
+    return info, questions, seed, None
+
+def plan_manual(data, seed=None, user_id=None):
+    """Validate a manual role/level submission and sample its questions (see plan_resume)"""
+    role = data.get("role")
+    level = data.get("level")
+    name = data.get("name")
+    email = data.get("email")
+    skills = data.get("skills", "").split(", ") if data.get("skills") else []
+
+    # Validate inputs
+    if not all([role, level, name]):
+        return None, None, None, ({"error": "Missing required fields"}, 400)
+
+    levels = get_levels_for_role(role)
+    if level not in levels:
+        return None, None, None, ({"error": f"Level '{level}' not valid for role '{role}'"}, 400)
+
+    info = {
+        "name": name,
+        "email": email,
+        "skills": [skill.strip() for skill in skills if skill.strip()],
+        "role": role,
+        "level": level
+    }
+
+    if seed is None:
+        seed = question_seed(role, level, user_id)
+    with stage("sample_questions"):
+        questions = get_questions_by_role_and_level(role, level, seed=seed, skills=info.get("skills"))
+    if not questions:
+        return info, None, seed, ({"error": f"No questions found for {role} ({level})"}, 400)
+
+    return info, questions, seed, None
+
+def resume_payload(info, seed, answers):
+    return {"needsManualInput": False, "info": info, "seed": seed, "questions": answers}
+
+def manual_payload(info, seed, answers):
+    return {"info": info, "seed": seed, "questions": answers}
+
+def process_resume_data(data, filename, seed=None, user_id=None):
+    """Run the whole resume flow; returns the (payload, status) to jsonify"""
+    info, questions, seed, early = plan_resume(data, filename, seed, user_id)
+    if early:
+        return early
+    return resume_payload(info, seed, answer_questions(info["role"], info["level"], questions)), 200
+
+def process_manual_data(data, seed=None, user_id=None):
+    """Run the whole manual-submission flow; returns the (payload, status) to jsonify"""
+    info, questions, seed, early = plan_manual(data, seed, user_id)
+    if early:
+        return early
+    return manual_payload(info, seed, answer_questions(info["role"], info["level"], questions)), 200
+
+def read_resume_upload():
+    """Validate the current request's resume upload and seed.
+
+    Returns ((data, filename, seed), None), or (None, (payload, status)) to
+    send back instead.
+    """
+    if 'resume' not in request.files:
+        return None, ({"error": "No file uploaded"}, 400)
+    
+    uploaded_file = request.files["resume"]
+    
+    # Validate file
+    is_valid, message = validate_resume_file(uploaded_file)
+    if not is_valid:
+        return None, ({"error": message, "invalid_file": True}, 400)
+
     try:
-        if 'resume' not in request.files:
-            return jsonify({"error": "No file uploaded"}), 400
-        
-        uploaded_file = request.files["resume"]
-        
-        # Validate file
-        is_valid, message = validate_resume_file(uploaded_file)
-        if not is_valid:
-            return jsonify({"error": message, "invalid_file": True}), 400
+        seed = requested_seed(request.form)
+    except ValueError as e:
+        return None, ({"error": f"Invalid seed: {e}"}, 400)
 
-        # Save the uploaded file
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], f"{session['user_id']}_{uploaded_file.filename}")
-        uploaded_file.save(filepath)
+    with stage("upload_read"):
+        data = uploaded_file.read()
 
-        # Extract resume information
-        info = extract_resume_info(filepath)
-        
-        role = info.get("role")
-        level = info.get("level")
-        all_roles = get_all_roles()
+    # Optionally keep the original file, without blocking the request on disk I/O
+    if PERSIST_UPLOADS:
+        filename = secure_filename(f"{session['user_id']}_{uploaded_file.filename}")
+        upload_writer.submit(persist_upload, os.path.join(app.config["UPLOAD_FOLDER"], filename), data)
 
-        # Check if we need manual input
-        needs_manual = False
-        if not role or role not in all_roles:
-            needs_manual = True
-        else:
-            levels = get_levels_for_role(role)
-            if not level or level not in levels:
-                needs_manual = True
-
-        if needs_manual:
-            return jsonify({
-                "needsManualInput": True,
-                "info": info,
-                "availableRoles": all_roles
-            })
+    return (data, uploaded_file.filename, seed), None
 
-        # Process automatically
-        questions = get_questions_by_role_and_level(role, level)
-        if not questions:
-            return jsonify({"error": f"No questions found for {role} ({level})"}), 400
+def read_manual_submission():
+    """Parse the current request's manual submission; returns ((data, seed), None) or (None, early)"""
+    data = request.get_json()
+    try:
+        seed = requested_seed(data)
+    except ValueError as e:
+        return None, ({"error": f"Invalid seed: {e}"}, 400)
+    return (data, seed), None
+
+def submit_job(fn, *args):
+    """Queue fn in the background and tell the client where to poll"""
+    job_id = job_manager.submit(session['user_id'], fn, *args)
+    return jsonify({
+        "jobId": job_id,
+        "status": "queued",
+        "statusUrl": url_for("get_job", job_id=job_id)
+    }), 202
+
+@app.route("/process-resume", methods=["POST"])
+def process_resume():
+    if 'user_id' not in session:
+        return jsonify({"error": "Please login first"}), 401
+    
+    try:
+        upload, early = read_resume_upload()
+        if early:
+            return jsonify(early[0]), early[1]
+        data, filename, seed = upload
 
-        prompt = format_prompt_for_granite(role, level, questions)
+        user_id = session['user_id']
+        if wants_job():
+            return submit_job(process_resume_data, data, filename, seed, user_id)
 
-        response = get_gemini_response(prompt)
-        parsed_questions = parse_gemini_response(response, questions)
+        if wants_stream():
+            info, questions, seed, early = plan_resume(data, filename, seed, user_id)
+            if early:
+                return jsonify(early[0]), early[1]
+            return stream_questions_response(info, info["role"], info["level"], questions, seed)
 
-        return jsonify({
-            "needsManualInput": False,
-            "info": info,
-            "questions": parsed_questions
-        })
+        payload, status = process_resume_data(data, filename, seed, user_id)
+        return jsonify(payload), status
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -298,41 +444,86 @@ def submit_manual():
         return jsonify({"error": "Please login first"}), 401
     
     try:
-        data = request.get_json()
-        
-        role = data.get("role")
-        level = data.get("level")
-        name = data.get("name")
-        email = data.get("email")
-        skills = data.get("skills", "").split(", ") if data.get("skills") else []
+        submission, early = read_manual_submission()
+        if early:
+            return jsonify(early[0]), early[1]
+        data, seed = submission
 
-        # Validate inputs
-        if not all([role, level, name]):
-            return jsonify({"error": "Missing required fields"}), 400
+        user_id = session['user_id']
+        if wants_job():
+            return submit_job(process_manual_data, data, seed, user_id)
 
-        levels = get_levels_for_role(role)
-        if level not in levels:
-            return jsonify({"error": f"Level '{level}' not valid for role '{role}'"}), 400
+        if wants_stream():
+            info, questions, seed, early = plan_manual(data, seed, user_id)
+            if early:
+                return jsonify(early[0]), early[1]
+            return stream_questions_response(info, info["role"], info["level"], questions, seed)
 
-        info = {
-            "name": name,
-            "email": email,
-            "skills": [skill.strip() for skill in skills if skill.strip()],
-            "role": role,
-            "level": level
-        }
+        payload, status = process_manual_data(data, seed, user_id)
+        return jsonify(payload), status
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        questions = get_questions_by_role_and_level(role, level)
-        if not questions:
-            return jsonify({"error": f"No questions found for {role} ({level})"}), 400
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({"error": "Please login first"}), 401
 
-        prompt = format_prompt_for_granite(role, level, questions)
-        response = get_gemini_response(prompt)
-        parsed_questions = parse_gemini_response(response, questions)
+    try:
+        job = job_manager.get(job_id, session['user_id'])
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        timings = current_timings()
+        if timings is not None:
+            # The job's stages ran in the background; report them on the poll that sees it finish
+            for name, ms in job.get("stages_ms", {}).items():
+                timings.add(f"job_{name}", ms / 1000.0)
+        return jsonify(job_status(job))
 
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/questions/search", methods=["GET"])
+def search_questions():
+    if 'user_id' not in session:
+        return jsonify({"error": "Please login first"}), 401
+
+    query = request.args.get("q", "").strip()
+    role = request.args.get("role")
+    level = request.args.get("level")
+    competency = request.args.get("competency")
+    if not (query or role or level or competency):
+        return jsonify({"error": "Provide a query (q) or a role/level/competency filter"}), 400
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("perPage", SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "page and perPage must be integers"}), 400
+
+    try:
+        with stage("search"):
+            index = get_search_index()
+            total, hits = index.search(
+                query, role=role, level=level, competency=competency,
+                offset=(page - 1) * per_page, limit=per_page
+            )
+        results = []
+        for doc, score in hits:
+            doc_role, doc_level, doc_competency = index.describe(doc)
+            results.append({
+                "question": index.questions[doc],
+                "role": doc_role,
+                "level": doc_level,
+                "competency": doc_competency,
+                "score": round(score, 4)
+            })
         return jsonify({
-            "info": info,
-            "questions": parsed_questions
+            "query": query,
+            "total": total,
+            "page": page,
+            "perPage": per_page,
+            "results": results
         })
 
     except Exception as e:
@@ -340,7 +531,15 @@ def submit_manual():
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy"})
+    return jsonify({
+        "status": "healthy",
+        "gemini": {
+            "breaker": get_gemini_client().breaker.state,
+            "singleflight": get_singleflight_stats(),
+            "response_cache": get_response_cache_stats(),
+        },
+    })
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only; production runs gunicorn -c gunicorn.conf.py (see wsgi.py)
+    app.run(debug=os.getenv("FLASK_DEBUG", "0") == "1", port=int(os.getenv("PORT", "5000")))
\ No newline at end of file
@@ -0,0 +1,274 @@
+# asgi.py
+"""ASGI entry point: the processing routes on an event loop, everything else via Flask.
+
+    uvicorn asgi:app --workers 2
+
+POST /process-resume and POST /submit-manual (the plain JSON flavour, without
+?stream=1 or ?async=1) run as coroutines. Gemini calls are awaited
+(generate_content_async), and body parsing, resume text extraction and
+question sampling run on the offload thread pool, so a request waiting on Gemini holds neither
+a worker nor a thread and one process can keep hundreds of generations in
+flight. Request validation, sessions and the response (CORS, Server-Timing,
+metrics) still go through the Flask app, so both modes behave the same.
+
+All other requests (pages, login, streaming, jobs, search, health, metrics)
+are handed to the Flask app through a small WSGI bridge on the same pool.
+A ?stream=1 request holds its thread until its last answer is sent, so
+streams run on their own pool of ASGI_STREAM_THREADS and are refused with
+503 while it is full, instead of starving everything else of threads.
+There are no websocket routes: websocket connections are refused.
+The processing routes never touch MongoDB (the session is the signed Flask
+cookie), so no async Mongo driver is needed.
+"""
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from flask import jsonify, session
+
+import app as flask_module
+from answer_pipeline import answer_questions_async
+from metrics import begin_request, in_current_context
+
+logger = logging.getLogger(__name__)
+
+# Threads for blocking work: body parsing, resume extraction, question sampling and bridged Flask requests
+ASGI_OFFLOAD_THREADS = int(os.getenv("ASGI_OFFLOAD_THREADS", "32"))
+
+flask_app = flask_module.app
+_offload = ThreadPoolExecutor(max_workers=ASGI_OFFLOAD_THREADS, thread_name_prefix="asgi-offload")
+# Threads for Server-Sent Event streams, each held for the whole generation
+ASGI_STREAM_THREADS = int(os.getenv("ASGI_STREAM_THREADS", "16"))
+_streams = ThreadPoolExecutor(max_workers=ASGI_STREAM_THREADS, thread_name_prefix="asgi-stream")
+_stream_slots = threading.BoundedSemaphore(ASGI_STREAM_THREADS)
+
+STREAMS_BUSY_ERROR = "Too many answers are being streamed right now. Please try again shortly."
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope and its fully read body"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if client:
+        environ["REMOTE_ADDR"] = client[0]
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_LENGTH":
+            continue
+        key = name if name == "CONTENT_TYPE" else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("Client disconnected before sending the whole body")
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+def _run_wsgi(environ, loop, send):
+    """Run the Flask app for one request on this thread, forwarding its output to send.
+
+    The whole response, including a streamed body, is produced on a single
+    thread because Flask's request context must stay on the thread it was
+    pushed on.
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    def forward(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    iterable = flask_app(environ, start_response)
+    try:
+        started = False
+        for chunk in iterable:
+            if not chunk:
+                continue
+            if not started:
+                forward({"type": "http.response.start", "status": response["status"],
+                         "headers": _encode_headers(response["headers"])})
+                started = True
+            forward({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not started:
+            forward({"type": "http.response.start", "status": response["status"],
+                     "headers": _encode_headers(response["headers"])})
+        forward({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+async def offload(fn, *args):
+    """Run a blocking call on the offload pool; its stage timings count towards this request"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_offload, in_current_context(fn, *args))
+
+
+async def _send_flask_response(environ, payload, status, send):
+    """Send a JSON payload as the Flask app would, after_request hooks included"""
+    with flask_app.request_context(environ):
+        response = flask_app.process_response(flask_app.make_response((jsonify(payload), status)))
+        body = response.get_data()
+        headers = _encode_headers(response.headers.items())
+    try:
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+    finally:
+        response.close()
+
+
+def _read_submission(environ, read):
+    """Session check and body parsing for an async route: (parsed, user_id, early response)
+
+    Parsing a multipart upload is CPU work, so this runs on the offload pool.
+    """
+    with flask_app.request_context(environ):
+        if 'user_id' not in session:
+            return None, None, ({"error": "Please login first"}, 401)
+        parsed, early = read()
+        return parsed, session['user_id'], early
+
+
+async def process_resume(environ):
+    """Async /process-resume; returns (payload, status)"""
+    upload, user_id, early = await offload(_read_submission, environ, flask_module.read_resume_upload)
+    if early:
+        return early
+    data, filename, seed = upload
+
+    info, questions, seed, early = await offload(flask_module.plan_resume, data, filename, seed, user_id)
+    if early:
+        return early
+    answers = await answer_questions_async(info["role"], info["level"], questions, offload=offload)
+    return flask_module.resume_payload(info, seed, answers), 200
+
+
+async def submit_manual(environ):
+    """Async /submit-manual; returns (payload, status)"""
+    submission, user_id, early = await offload(_read_submission, environ, flask_module.read_manual_submission)
+    if early:
+        return early
+    data, seed = submission
+
+    info, questions, seed, early = await offload(flask_module.plan_manual, data, seed, user_id)
+    if early:
+        return early
+    answers = await answer_questions_async(info["role"], info["level"], questions, offload=offload)
+    return flask_module.manual_payload(info, seed, answers), 200
+
+
+ASYNC_ROUTES = {
+    ("POST", "/process-resume"): process_resume,
+    ("POST", "/submit-manual"): submit_manual,
+}
+
+
+def _route(scope):
+    """(coroutine handler or None, whether the request streams its answers)"""
+    if (scope["method"], scope["path"]) not in ASYNC_ROUTES:
+        return None, False
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    # Streams and background jobs keep their thread-based implementations
+    if query.get("stream") == ["1"]:
+        return None, True
+    if query.get("async") == ["1"]:
+        return None, False
+    return ASYNC_ROUTES[(scope["method"], scope["path"])], False
+
+
+async def _bridge_stream(environ, send):
+    """Serve a streaming request through Flask on the stream pool, or refuse it while the pool is full"""
+    if not _stream_slots.acquire(blocking=False):
+        await _send_flask_response(environ, {"error": STREAMS_BUSY_ERROR}, 503, send)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_streams, _run_wsgi, environ, loop, send)
+    finally:
+        _stream_slots.release()
+
+
+async def _refuse_websocket(receive, send):
+    message = await receive()
+    if message["type"] == "websocket.connect":
+        # Closing before accepting rejects the handshake (HTTP 403)
+        await send({"type": "websocket.close", "code": 1000})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _offload.shutdown(wait=False)
+            _streams.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] == "websocket":
+        return await _refuse_websocket(receive, send)
+    if scope["type"] != "http":
+        logger.warning(f"Ignoring unsupported ASGI scope type {scope['type']!r}")
+        return
+
+    body = await read_body(receive)
+    handler, streams = _route(scope)
+    if streams:
+        return await _bridge_stream(wsgi_environ(scope, body), send)
+    if handler is None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_offload, _run_wsgi, wsgi_environ(scope, body), loop, send)
+        return
+
+    # Stage timings of this request are collected in this task's context. The stack
+    # profiler is not started: it samples threads, and this request has none of its own.
+    begin_request()
+    try:
+        payload, status = await handler(wsgi_environ(scope, body))
+    except Exception as e:
+        logger.error(f"{scope['method']} {scope['path']} failed: {e}")
+        payload, status = {"error": str(e)}, 500
+    # A fresh environ: the handler's request context consumed the first one's input stream
+    await _send_flask_response(wsgi_environ(scope, body), payload, status, send)
@@ -0,0 +1,344 @@
+# bank_snapshot.py
+"""Compiled binary snapshot of the question bank.
+
+Parsing and normalizing interview_ques.json costs every worker time and
+memory at startup. This module validates the JSON against the bank schema
+and compiles it into a snapshot file with a pool of interned UTF-8 strings
+and the lookup tables of granite's compiled bank as flat integer arrays.
+Workers memory-map the snapshot read-only: the pages are shared through the
+OS page cache (and across forked workers), only the small role/level index
+is decoded at load, and a level's questions are decoded on first use.
+
+    python bank_snapshot.py                      # interview_ques.json -> interview_ques.qbs
+    python bank_snapshot.py --check              # validate only
+
+QuestionBank loads the snapshot next to the JSON file when its recorded
+source mtime/size or SHA-256 still match, and falls back to the JSON otherwise.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from granite import CompetencySampler, _CompiledBank
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IQBS"
+FORMAT_VERSION = 1
+SNAPSHOT_EXTENSION = ".qbs"
+
+# magic, version, reserved, source sha256, source mtime_ns, source size,
+# string/role/role-key/level/key/question/competency counts, then 9 section offsets
+HEADER = struct.Struct("<4sHH32sqQ7I9Q")
+SECTION_ALIGNMENT = 8
+
+
+class BankValidationError(ValueError):
+    """Raised with every schema violation found in a question bank"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} schema error(s): " + "; ".join(errors[:10]))
+        self.errors = errors
+
+
+def _is_text(value):
+    return isinstance(value, str) and value.strip() != ""
+
+
+def validate_bank(data):
+    """Check a parsed question bank against the schema granite expects.
+
+    Raises BankValidationError listing every problem with its JSON path.
+    """
+    errors = []
+    if not isinstance(data, dict):
+        raise BankValidationError(["$: expected an object"])
+    framework = data.get("qualitativeInterviewFramework")
+    if not isinstance(framework, list) or not framework:
+        raise BankValidationError(["$.qualitativeInterviewFramework: expected a non-empty array"])
+
+    for r, entry in enumerate(framework):
+        path = f"$.qualitativeInterviewFramework[{r}]"
+        if not isinstance(entry, dict):
+            errors.append(f"{path}: expected an object")
+            continue
+        if not _is_text(entry.get("role")):
+            errors.append(f"{path}.role: expected a non-empty string")
+        levels = entry.get("levels")
+        if not isinstance(levels, list) or not levels:
+            errors.append(f"{path}.levels: expected a non-empty array")
+            continue
+
+        for l, level in enumerate(levels):
+            level_path = f"{path}.levels[{l}]"
+            if not isinstance(level, dict):
+                errors.append(f"{level_path}: expected an object")
+                continue
+            if not _is_text(level.get("level")):
+                errors.append(f"{level_path}.level: expected a non-empty string")
+            areas = level.get("competencyAreas")
+            if not isinstance(areas, list):
+                errors.append(f"{level_path}.competencyAreas: expected an array")
+                continue
+
+            for a, area in enumerate(areas):
+                area_path = f"{level_path}.competencyAreas[{a}]"
+                if not isinstance(area, dict):
+                    errors.append(f"{area_path}: expected an object")
+                    continue
+                for field in ("competency", "whatInterviewerLooksFor"):
+                    if field in area and not isinstance(area[field], str):
+                        errors.append(f"{area_path}.{field}: expected a string")
+                weight = area.get("samplingWeight", 1)
+                if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+                    errors.append(f"{area_path}.samplingWeight: expected a non-negative number")
+                questions = area.get("qualitativeQuestionExamples")
+                if not isinstance(questions, list):
+                    errors.append(f"{area_path}.qualitativeQuestionExamples: expected an array")
+                    continue
+                for q, question in enumerate(questions):
+                    if not _is_text(question):
+                        errors.append(f"{area_path}.qualitativeQuestionExamples[{q}]: expected a non-empty string")
+
+    if errors:
+        raise BankValidationError(errors)
+
+
+def read_bank(questions_path):
+    """Return (raw bytes, parsed data) of a question file that passes validate_bank"""
+    with open(questions_path, "rb") as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise BankValidationError([f"$: invalid JSON ({e})"]) from e
+    validate_bank(data)
+    return raw, data
+
+
+def snapshot_path_for(questions_path):
+    """Default snapshot location next to the question file"""
+    return os.path.splitext(questions_path)[0] + SNAPSHOT_EXTENSION
+
+
+def _align(size):
+    return (size + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def compile_snapshot(questions_path, output_path=None):
+    """Validate the question file and write its snapshot atomically; returns the output path"""
+    output_path = output_path or snapshot_path_for(questions_path)
+    stat = os.stat(questions_path)
+    raw, data = read_bank(questions_path)
+    compiled = _CompiledBank(data)
+
+    strings = {}
+
+    def intern(text):
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    roles = [intern(role) for role in compiled.roles]
+    role_keys = []  # role key id, first level, level count
+    level_names = []
+    for role_key, levels in compiled.levels.items():
+        role_keys += [intern(role_key), len(level_names), len(levels)]
+        level_names += [intern(level) for level in levels]
+
+    keys = []  # role key id, level key id, first question, question count, first area, area count
+    question_refs = []
+    areas = []  # name id, start, end, looks-for id
+    weights = []
+    for key, questions in compiled.questions.items():
+        competencies = compiled.competencies[key]
+        keys += [intern(key[0]), intern(key[1]), len(question_refs), len(questions),
+                 len(weights), len(competencies)]
+        question_refs += [intern(question) for question in questions]
+        for (name, start, end, looks_for), weight in zip(competencies, compiled.area_weights[key]):
+            areas += [intern(name), start, end, intern(looks_for)]
+            weights.append(weight)
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = [0]
+    for blob in encoded:
+        string_offsets.append(string_offsets[-1] + len(blob))
+
+    sections = [
+        struct.pack(f"<{len(string_offsets)}Q", *string_offsets),
+        struct.pack(f"<{len(roles)}I", *roles),
+        struct.pack(f"<{len(role_keys)}I", *role_keys),
+        struct.pack(f"<{len(level_names)}I", *level_names),
+        struct.pack(f"<{len(keys)}I", *keys),
+        struct.pack(f"<{len(question_refs)}I", *question_refs),
+        struct.pack(f"<{len(areas)}I", *areas),
+        struct.pack(f"<{len(weights)}d", *weights),
+        b"".join(encoded),
+    ]
+    offsets = []
+    position = _align(HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _align(position + len(section))
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, hashlib.sha256(raw).digest(), stat.st_mtime_ns, stat.st_size,
+        len(strings), len(roles), len(role_keys) // 3, len(level_names), len(keys) // 6,
+        len(question_refs), len(weights), *offsets
+    )
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class _LazyTable:
+    """Read-only mapping whose values are decoded from the snapshot on first access"""
+
+    def __init__(self, index, build):
+        self._index = index  # key -> record number
+        self._build = build
+        self._values = {}
+
+    def get(self, key, default=None):
+        value = self._values.get(key)
+        if value is None:
+            record = self._index.get(key)
+            if record is None:
+                return default
+            # Concurrent first accesses may both build; the results are identical
+            value = self._values[key] = self._build(record)
+        return value
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+
+class SnapshotBank:
+    """Memory-mapped snapshot with the same lookup attributes as granite's compiled bank"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            fields = HEADER.unpack_from(self._mmap, 0)
+        except struct.error as e:
+            raise ValueError(f"{path}: truncated snapshot") from e
+        if sys.byteorder != "little":
+            raise ValueError("snapshots are little-endian and are read with native-order array views")
+        magic, version = fields[0], fields[1]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a version {FORMAT_VERSION} question bank snapshot")
+        self.source_digest = fields[3].hex()
+        self.source_stamp = (fields[4], fields[5])
+        n_strings, n_roles, n_role_keys, n_levels, n_keys, n_questions, n_areas = fields[6:13]
+        offsets = fields[13:]
+
+        view = memoryview(self._mmap)
+        self._string_offsets = view[offsets[0]:offsets[0] + 8 * (n_strings + 1)].cast("Q")
+        role_ids = view[offsets[1]:offsets[1] + 4 * n_roles].cast("I")
+        role_keys = view[offsets[2]:offsets[2] + 12 * n_role_keys].cast("I")
+        level_names = view[offsets[3]:offsets[3] + 4 * n_levels].cast("I")
+        self._keys = view[offsets[4]:offsets[4] + 24 * n_keys].cast("I")
+        self._question_refs = view[offsets[5]:offsets[5] + 4 * n_questions].cast("I")
+        self._areas = view[offsets[6]:offsets[6] + 16 * n_areas].cast("I")
+        self._weights = view[offsets[7]:offsets[7] + 8 * n_areas].cast("d")
+        self._blob = view[offsets[8]:]
+        self._strings = {}
+        self._strings_lock = threading.Lock()
+
+        self.roles = tuple(self._string(i) for i in role_ids)
+        self.levels = {}
+        for r in range(n_role_keys):
+            key_id, start, count = role_keys[3 * r:3 * r + 3]
+            self.levels[self._string(key_id)] = tuple(self._string(i) for i in level_names[start:start + count])
+
+        index = {}
+        for k in range(n_keys):
+            index[(self._string(self._keys[6 * k]), self._string(self._keys[6 * k + 1]))] = k
+        self.questions = _LazyTable(index, self._build_questions)
+        self.competencies = _LazyTable(index, self._build_competencies)
+        self.samplers = _LazyTable(index, self._build_sampler)
+
+    def _string(self, i):
+        text = self._strings.get(i)
+        if text is None:
+            offsets = self._string_offsets
+            text = str(self._blob[offsets[i]:offsets[i + 1]], "utf-8")
+            with self._strings_lock:
+                text = self._strings.setdefault(i, text)
+        return text
+
+    def _record(self, k):
+        return self._keys[6 * k + 2:6 * k + 6]
+
+    def _build_questions(self, k):
+        start, count, _, _ = self._record(k)
+        return tuple(self._string(i) for i in self._question_refs[start:start + count])
+
+    def _build_competencies(self, k):
+        _, _, start, count = self._record(k)
+        areas = self._areas
+        return tuple(
+            (self._string(areas[4 * a]), areas[4 * a + 1], areas[4 * a + 2], self._string(areas[4 * a + 3]))
+            for a in range(start, start + count)
+        )
+
+    def _build_sampler(self, k):
+        _, count, start, area_count = self._record(k)
+        areas = self._areas
+        return CompetencySampler(count, [
+            (areas[4 * a + 1], areas[4 * a + 2], self._weights[a]) for a in range(start, start + area_count)
+        ])
+
+
+def load_snapshot(path):
+    """Open a snapshot, or return None if it is missing or unreadable"""
+    try:
+        return SnapshotBank(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring question bank snapshot {path}: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate interview_ques.json and compile its binary snapshot")
+    parser.add_argument("--questions", default="interview_ques.json", help="question bank JSON file")
+    parser.add_argument("--output", help="snapshot path (default: next to the JSON, .qbs)")
+    parser.add_argument("--check", action="store_true", help="only validate the JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        if args.check:
+            read_bank(args.questions)
+            print(f"✅ {args.questions} is valid")
+            return 0
+        output = compile_snapshot(args.questions, args.output)
+    except BankValidationError as e:
+        for error in e.errors:
+            print(f"❌ {error}", file=sys.stderr)
+        return 1
+    print(f"✅ Wrote {output} ({os.path.getsize(output):,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+# async_benchmark.py
+"""Thread-per-request vs event loop for /submit-manual against a slow Gemini.
+
+Runs in one process with the fake Gemini backend, so only the serving model
+differs: the sync side drives the Flask app from --workers threads (like
+gunicorn's gthread workers), the async side drives asgi.app from a single
+event loop. All requests arrive at once, so latencies include the time a
+request queued for a free thread. Each request generates its answers with
+one Gemini call of --latency ms. Request coalescing and the response cache
+are switched off so every request really waits on Gemini.
+
+    python benchmarks/async_benchmark.py --requests 400 --workers 16 --latency 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, HERE)
+
+from load_test import percentile  # noqa: E402
+
+ROLE, LEVEL = "Data Scientist", "Junior"
+
+
+def configure(latency_ms):
+    """Point the app at local stand-ins; must run before the app is imported"""
+    os.environ.update({
+        "GEMINI_BACKEND": "fake",
+        "MONGO_BACKEND": "memory",
+        "FAKE_GEMINI_LATENCY": f"fixed:{latency_ms:g}",
+        "GEMINI_COALESCE": "0",
+        "GEMINI_CACHE_SIZE": "0",
+        "ANSWER_STORE_DIR": tempfile.mkdtemp(prefix="answer-store-"),
+        "SERVER_TIMING": "0",
+    })
+
+
+def submission(n):
+    return {"role": ROLE, "level": LEVEL, "name": f"User {n}", "seed": n}
+
+
+def run_sync(flask_app, requests, workers):
+    """Latencies (seconds) of requests served by a fixed pool of worker threads"""
+    latencies, failures, lock = [], [], threading.Lock()
+    pending = iter(range(requests))
+    arrived = time.perf_counter()
+
+    def worker():
+        client = flask_app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = "benchmark"
+        while True:
+            with lock:
+                n = next(pending, None)
+            if n is None:
+                return
+            response = client.post("/submit-manual", json=submission(n))
+            elapsed = time.perf_counter() - arrived
+            with lock:
+                (latencies if response.status_code == 200 else failures).append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures)
+
+
+async def asgi_request(app, cookie, body):
+    """POST /submit-manual through the ASGI app; returns the status code"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/submit-manual", "root_path": "", "query_string": b"",
+        "server": ("benchmark", 80), "client": ("127.0.0.1", 0),
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"cookie", f"session={cookie}".encode("latin-1")),
+        ],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def run_async(asgi_app, cookie, requests):
+    """Latencies (seconds) of requests all served concurrently by one event loop"""
+    arrived = time.perf_counter()
+
+    async def timed(n):
+        status = await asgi_request(asgi_app, cookie, json.dumps(submission(n)).encode("utf-8"))
+        return status, time.perf_counter() - arrived
+
+    results = await asyncio.gather(*(timed(n) for n in range(requests)))
+    latencies = [elapsed for status, elapsed in results if status == 200]
+    return latencies, len(results) - len(latencies)
+
+
+def summarize(name, latencies, failures, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "mode": name,
+        "ok": len(ordered),
+        "failed": failures,
+        "seconds": round(elapsed, 2),
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200, help="manual submissions per mode")
+    parser.add_argument("--workers", type=int, default=16, help="request threads on the sync side")
+    parser.add_argument("--latency", type=float, default=1000, help="fake Gemini latency per call, ms")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    configure(args.latency)
+    import app as flask_module
+    import asgi
+
+    flask_app = flask_module.app
+    cookie = flask_app.session_interface.get_signing_serializer(flask_app).dumps({"user_id": "benchmark"})
+
+    print(f"{args.requests} requests per mode, Gemini latency {args.latency:g} ms")
+    results = []
+    started = time.perf_counter()
+    latencies, failures = run_sync(flask_app, args.requests, args.workers)
+    results.append(summarize(f"sync ({args.workers} threads)", latencies, failures, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    latencies, failures = asyncio.run(run_async(asgi.app, cookie, args.requests))
+    results.append(summarize("async (1 event loop)", latencies, failures, time.perf_counter() - started))
+
+    print(f"{'mode':<22} {'ok':>5} {'failed':>6} {'seconds':>8} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for row in results:
+        print(f"{row['mode']:<22} {row['ok']:>5} {row['failed']:>6} {row['seconds']:>8} "
+              f"{row['rps']:>7} {row['p50_ms']:>7} {row['p95_ms']:>7}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"requests": args.requests, "latency_ms": args.latency, "results": results}, f, indent=2)
+    return 0 if all(row["failed"] == 0 for row in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+# bank_startup_benchmark.py
+"""Worker startup cost of the question bank: JSON parsing vs the compiled snapshot.
+
+Builds a bank that repeats interview_ques.json --scale times (each copy gets
+its own role names), compiles its snapshot, then starts fresh interpreters
+that load the bank and answer one question lookup, as a worker does on its
+first request. Reports wall time and the resident memory the load added.
+
+    python benchmarks/bank_startup_benchmark.py --scale 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+from bank_snapshot import compile_snapshot  # noqa: E402
+
+# Runs in a fresh interpreter: load the bank and do the first lookup
+CHILD = r"""
+import os, sys, time
+sys.path.insert(0, {app_dir!r})
+import granite
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+before = rss_kb()
+started = time.perf_counter()
+bank = granite.QuestionBank({path!r}, snapshot_path={snapshot!r})
+role = bank.roles()[-1]
+level = bank.levels(role)[0]
+assert bank.sample(role, level, 10)
+print(time.perf_counter() - started, rss_kb() - before)
+"""
+
+
+def scaled_bank(source, scale):
+    with open(source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data["qualitativeInterviewFramework"]
+    scaled = []
+    for copy in range(scale):
+        for entry in entries:
+            scaled.append(dict(entry, role=f"{entry['role']} #{copy}" if copy else entry["role"]))
+    return {"qualitativeInterviewFramework": scaled}
+
+
+def measure(path, snapshot, runs):
+    timings, memory = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD.format(app_dir=APP_DIR, path=path, snapshot=snapshot)],
+            check=True, capture_output=True, text=True
+        ).stdout.split()
+        timings.append(float(output[0]) * 1000)
+        memory.append(int(output[1]) / 1024)
+    return statistics.median(timings), statistics.median(memory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare question bank startup: JSON vs snapshot")
+    parser.add_argument("--questions", default=os.path.join(APP_DIR, "interview_ques.json"))
+    parser.add_argument("--scale", type=int, default=100, help="copies of the bank to load")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists("/proc/self/statm"):
+        sys.exit("This benchmark reads /proc/self/statm and needs Linux")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(scaled_bank(args.questions, args.scale), f)
+        snapshot = os.path.join(tmp, "bank.qbs")
+        started = time.perf_counter()
+        compile_snapshot(path, snapshot)
+        print(f"Bank x{args.scale}: JSON {os.path.getsize(path) / 2**20:.1f} MB, "
+              f"snapshot {os.path.getsize(snapshot) / 2**20:.1f} MB "
+              f"(compiled in {time.perf_counter() - started:.1f}s)")
+
+        for name, snapshot_path in (("json", os.path.join(tmp, "missing.qbs")), ("snapshot", snapshot)):
+            elapsed, rss = measure(path, snapshot_path, args.runs)
+            print(f"{name:<9} load + first lookup {elapsed:9.1f} ms   RSS +{rss:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# load_test.py
+"""Closed-loop HTTP load generator for sizing gunicorn workers.
+
+Each virtual user registers its own account (the session cookie keeps it
+logged in on every worker), then sends requests back to back until the
+run ends, picking routes by weight. The report shows throughput and latency
+percentiles per route; streamed routes also get a "first byte" row, which
+is what users wait on before the first answer appears.
+
+Start the app against local stand-ins, then point the generator at it:
+
+    MONGO_BACKEND=memory GEMINI_BACKEND=fake FAKE_GEMINI_LATENCY=lognormal:1500,0.5 \\
+        gunicorn -w 4 --threads 8 -b 127.0.0.1:5000 app:app
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 32 --duration 60
+
+Only the standard library plus PyMuPDF/python-docx (for the sample
+resumes) is needed on the client side.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, HERE)
+
+from granite import get_all_roles, get_levels_for_role  # noqa: E402
+from sample_resumes import sample_resumes  # noqa: E402
+
+DEFAULT_MIX = "manual=4,resume=3,search=2,health=1"
+SEARCH_TERMS = ["design", "data", "test", "deploy", "team", "scal*", "secur*", "model", "api", "user"]
+SKILLS = ["python", "sql", "aws", "docker", "react", "kubernetes", "java", "tableau", "spark"]
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("manual", "resume", "search", "health"):
+            raise ValueError(f"Unknown route {name!r} in --mix")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def multipart(fields, files):
+    """Encode form fields and (name, filename, bytes) files as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Recorder:
+    """Thread-safe latency samples and error counts per route"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.samples.setdefault(route, []).append(seconds)
+            self.statuses.setdefault(route, {}).setdefault(status, 0)
+            self.statuses[route][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, number, args, mix, resumes, roles, recorder, start_event, deadline):
+        super().__init__(name=f"user-{number}", daemon=True)
+        self.number = number
+        self.args = args
+        self.routes = list(mix)
+        self.weights = [mix[name] for name in self.routes]
+        self.resumes = resumes
+        self.roles = roles
+        self.recorder = recorder
+        self.start_event = start_event
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 100003 + number)
+        self.cookie = None
+        target = urlsplit(args.url)
+        self.host, self.port = target.hostname, target.port or 80
+        self.conn = None
+        self.failure = None
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+        return self.conn
+
+    def request(self, method, path, body=None, content_type=None, first_byte_route=None):
+        """Send one request and read the whole body; returns (status, body, seconds)"""
+        headers = {}
+        if content_type:
+            headers["Content-Type"] = content_type
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        for attempt in range(2):
+            started = time.perf_counter()
+            try:
+                conn = self._connection()
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                if first_byte_route:
+                    response.peek(1)
+                    self.recorder.record(first_byte_route, time.perf_counter() - started, response.status)
+                data = response.read()
+                elapsed = time.perf_counter() - started
+                cookie = response.getheader("Set-Cookie")
+                if cookie:
+                    self.cookie = cookie.split(";", 1)[0]
+                if response.will_close:
+                    self.close()
+                return response.status, data, elapsed
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # A kept-alive connection the server already dropped: reconnect once
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def register(self):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        payload = json.dumps({"name": f"Load User {self.number}", "email": email, "password": "load-test"})
+        status, body, elapsed = self.request("POST", "/register", payload, "application/json")
+        self.recorder.record("POST /register", elapsed, status)
+        if status != 200:
+            raise RuntimeError(f"Registration failed with {status}: {body[:200]!r}")
+
+    def _question_query(self):
+        query = {}
+        if self.args.stream:
+            query["stream"] = "1"
+        return f"?{urlencode(query)}" if query else ""
+
+    def _seed(self):
+        # A fresh seed per request keeps prompts (and so Gemini cache keys) varied
+        return None if self.args.fixed_seed else str(self.rng.randrange(2**31 - 1))
+
+    def manual(self):
+        role, levels = self.rng.choice(self.roles)
+        payload = {
+            "name": f"Load User {self.number}",
+            "email": "load@example.com",
+            "role": role,
+            "level": self.rng.choice(levels),
+            "skills": ", ".join(self.rng.sample(SKILLS, 3)),
+        }
+        seed = self._seed()
+        if seed is not None:
+            payload["seed"] = seed
+        route = "POST /submit-manual" + (" (stream)" if self.args.stream else "")
+        return route, ("POST", "/submit-manual" + self._question_query(), json.dumps(payload), "application/json")
+
+    def resume(self):
+        filename, data = self.rng.choice(self.resumes)
+        fields = {}
+        seed = self._seed()
+        if seed is not None:
+            fields["seed"] = seed
+        body, content_type = multipart(fields, [("resume", filename, data)])
+        route = "POST /process-resume" + (" (stream)" if self.args.stream else "")
+        return route, ("POST", "/process-resume" + self._question_query(), body, content_type)
+
+    def search(self):
+        query = {"q": self.rng.choice(SEARCH_TERMS)}
+        if self.rng.random() < 0.5:
+            query["role"] = self.rng.choice(self.roles)[0]
+        return "GET /questions/search", ("GET", f"/questions/search?{urlencode(query)}", None, None)
+
+    def health(self):
+        return "GET /health", ("GET", "/health", None, None)
+
+    def run(self):
+        try:
+            self.register()
+        except Exception as e:
+            self.failure = e
+            return
+        self.start_event.wait()
+        while time.perf_counter() < self.deadline[0]:
+            route, (method, path, body, content_type) = getattr(self, self.rng.choices(self.routes, self.weights)[0])()
+            streamed = self.args.stream and route.endswith("(stream)")
+            started = time.perf_counter()
+            try:
+                status, _, elapsed = self.request(
+                    method, path, body, content_type,
+                    first_byte_route=f"{route} first byte" if streamed else None
+                )
+            except Exception as e:
+                self.recorder.record(route, time.perf_counter() - started, type(e).__name__)
+                continue
+            self.recorder.record(route, elapsed, status)
+        self.close()
+
+
+def report(recorder, duration, out=sys.stdout):
+    rows = []
+    total = 0
+    for route in sorted(recorder.samples):
+        samples = sorted(recorder.samples[route])
+        if route != "POST /register" and not route.endswith("first byte"):
+            total += len(samples)
+        rows.append({
+            "route": route,
+            "requests": len(samples),
+            "errors": recorder.errors.get(route, 0),
+            "rps": len(samples) / duration if duration else 0.0,
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "max_ms": samples[-1] * 1000 if samples else 0.0,
+            "statuses": {str(k): v for k, v in recorder.statuses.get(route, {}).items()},
+        })
+
+    width = max([len(row["route"]) for row in rows] + [5])
+    print(f"{'route':<{width}} {'reqs':>7} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=out)
+    for row in rows:
+        print(f"{row['route']:<{width}} {row['requests']:>7} {row['errors']:>7} {row['rps']:>8.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}", file=out)
+    print(f"\nThroughput: {total / duration if duration else 0.0:.2f} req/s over {duration:.1f}s "
+          f"(registration excluded)", file=out)
+    return {"duration_s": duration, "throughput_rps": total / duration if duration else 0.0, "routes": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights, e.g. manual=4,resume=3,search=2,health=1")
+    parser.add_argument("--stream", action="store_true", help="request server-sent events from question routes")
+    parser.add_argument("--fixed-seed", action="store_true",
+                        help="let the server pick seeds, so repeated requests can hit its caches")
+    parser.add_argument("--resumes", type=int, default=40, help="distinct sample resumes to upload")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request socket timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    questions_path = os.path.join(APP_DIR, "interview_ques.json")
+    roles = [(role, get_levels_for_role(role, questions_path)) for role in get_all_roles(questions_path)]
+    resumes = sample_resumes(args.resumes, seed=args.seed) if "resume" in mix else []
+
+    recorder = Recorder()
+    start_event = threading.Event()
+    deadline = [float("inf")]
+    users = [VirtualUser(n, args, mix, resumes, roles, recorder, start_event, deadline) for n in range(args.users)]
+    for user in users:
+        user.start()
+    # Registration happens before the clock starts
+    while any(user.is_alive() and user.cookie is None and user.failure is None for user in users):
+        time.sleep(0.05)
+    failures = [user.failure for user in users if user.failure is not None]
+    if failures:
+        print(f"{len(failures)} of {args.users} users could not register: {failures[0]}", file=sys.stderr)
+        if len(failures) == len(users):
+            return 1
+
+    print(f"Running {args.users - len(failures)} users against {args.url} for {args.duration:g}s ...")
+    started = time.perf_counter()
+    deadline[0] = started + args.duration
+    start_event.set()
+    for user in users:
+        user.join()
+    # In-flight requests finish after the deadline; throughput counts the real elapsed time
+    elapsed = time.perf_counter() - started
+
+    summary = report(recorder, elapsed)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(dict(summary, users=args.users, mix=mix, stream=args.stream), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
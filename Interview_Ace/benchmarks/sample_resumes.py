@@ -0,0 +1,118 @@
+# sample_resumes.py
+"""Synthetic PDF and DOCX resumes for load tests.
+
+Every resume is unique (name, email and a project line vary), so uploads go
+through text extraction instead of the parse cache. Most profiles parse to a
+role and level in the question bank; the rest (a role the bank doesn't have,
+or a seniority label the role doesn't use) come back asking for manual input,
+as some real uploads do.
+
+    python benchmarks/sample_resumes.py --count 20 --output /tmp/resumes
+"""
+import argparse
+import io
+import os
+import random
+
+import fitz
+from docx import Document
+
+FIRST_NAMES = ["Alice", "Bruno", "Chen", "Divya", "Emeka", "Fatima", "Gustav", "Hana", "Ivan", "Julia",
+               "Kwame", "Lena", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tara"]
+LAST_NAMES = ["Anders", "Baptiste", "Costa", "Dubois", "Evans", "Fischer", "Garcia", "Haddad", "Ito",
+              "Jensen", "Kowalski", "Lopez", "Moreau", "Novak", "Okafor", "Patel", "Rossi", "Silva"]
+
+# (title as written on the resume, skills, parses to a bank role)
+PROFILES = [
+    ("Backend Developer", ["python", "django", "postgresql", "redis", "docker"], True),
+    ("Frontend Developer", ["javascript", "typescript", "react", "css", "webpack"], True),
+    ("Data Scientist", ["python", "pandas", "scikit-learn", "sql", "tableau"], True),
+    ("DevOps Engineer", ["kubernetes", "terraform", "aws", "jenkins", "bash"], True),
+    ("QA Engineer", ["selenium", "python", "jenkins", "sql"], True),
+    ("Data Engineer", ["spark", "kafka", "airflow", "sql", "aws"], True),
+    ("Data Analyst", ["sql", "excel", "tableau", "python"], True),
+    ("Machine Learning Engineer", ["python", "tensorflow", "pytorch", "docker"], True),
+    ("Game Developer", ["c++", "unity", "c#"], False),
+]
+# (phrase as written on the resume, years of experience)
+LEVELS = [("Junior", 1), ("Mid-Level", 4), ("Senior", 9)]
+
+
+def resume_text(rng, index):
+    """Lines of one resume and the (title, level phrase) it was built from"""
+    title, skills, _ = PROFILES[index % len(PROFILES)]
+    level, years = LEVELS[(index // len(PROFILES)) % len(LEVELS)]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [
+        f"{first} {last}",
+        f"{first.lower()}.{last.lower()}{index}@example.com",
+        "",
+        "Summary",
+        f"{level} {title} with {years} years of experience building production systems.",
+        "",
+        "Experience",
+        f"{level} {title}, Example Corp ({years} years)",
+        f"Delivered project #{index}: cut processing time by {rng.randint(10, 60)}%.",
+        "",
+        "Skills",
+        ", ".join(skills),
+        "",
+        "Education",
+        "BSc Computer Science, Example University",
+    ]
+    return lines, (title, level)
+
+
+def build_pdf(lines):
+    document = fitz.open()
+    page = document.new_page()
+    y = 72
+    for line in lines:
+        if line:
+            page.insert_text((72, y), line, fontsize=11)
+        y += 16
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def build_docx(lines):
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def sample_resumes(count, seed=0, docx_share=0.3):
+    """Return [(filename, bytes), ...]: count unique resumes, roughly docx_share of them DOCX"""
+    rng = random.Random(seed)
+    resumes = []
+    for index in range(count):
+        lines, _ = resume_text(rng, index)
+        if rng.random() < docx_share:
+            resumes.append((f"resume_{index}.docx", build_docx(lines)))
+        else:
+            resumes.append((f"resume_{index}.pdf", build_pdf(lines)))
+    return resumes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=len(PROFILES) * len(LEVELS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--docx-share", type=float, default=0.3)
+    parser.add_argument("--output", default="sample_resumes")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    for filename, data in sample_resumes(args.count, args.seed, args.docx_share):
+        with open(os.path.join(args.output, filename), "wb") as f:
+            f.write(data)
+    print(f"Wrote {args.count} resumes to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
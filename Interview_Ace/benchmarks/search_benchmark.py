@@ -0,0 +1,137 @@
+# search_benchmark.py
+"""Query latency of QuestionSearchIndex against a synthetic question bank.
+
+The synthetic bank reuses the real bank's vocabulary with a Zipf-like word
+distribution, spread over 20 roles x 3 levels x 5 competency areas.
+
+    python benchmarks/search_benchmark.py                  # 1,000,000 questions
+    python benchmarks/search_benchmark.py --questions 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, HERE)
+
+from granite import get_question_bank  # noqa: E402
+from load_test import percentile  # noqa: E402
+from question_search import QuestionSearchIndex, tokenize  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+ROLES = [f"Role {i}" for i in range(20)]
+LEVELS = ["Junior", "Mid-Level", "Senior"]
+COMPETENCIES = [f"Competency {i}" for i in range(5)]
+SAMPLES_PER_AREA = 50  # questions kept per area to draw filtered query terms from
+
+
+def vocabulary(questions_path):
+    bank = get_question_bank(questions_path)
+    words = set()
+    for role in bank.roles():
+        for level in bank.levels(role):
+            for question in bank.questions(role, level):
+                words.update(tokenize(question))
+    return sorted(words)
+
+
+def synthetic_entries(count, words, rng, samples=None):
+    """(role, level, competency, question) tuples in bank order.
+
+    If samples is a dict, the words of the first SAMPLES_PER_AREA questions
+    of each (role, level, competency) area are collected into it.
+    """
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    areas = [(r, l, c) for r in ROLES for l in LEVELS for c in COMPETENCIES]
+    per_area = count // len(areas) + 1
+    produced = 0
+    for role, level, competency in areas:
+        for _ in range(per_area):
+            if produced == count:
+                return
+            words_in_question = rng.choices(words, weights, k=rng.randint(8, 24))
+            if samples is not None:
+                area = samples.setdefault((role, level, competency), [])
+                if len(area) < SAMPLES_PER_AREA:
+                    area.append(words_in_question)
+            yield role, level, competency, " ".join(words_in_question).capitalize() + "?"
+            produced += 1
+
+
+def slice_terms(samples, rng, count, area):
+    """count distinct words from one sampled question of area, so a query filtered to it can match"""
+    question = sorted(set(rng.choice(samples[area])))
+    return " ".join(rng.sample(question, min(count, len(question))))
+
+
+def rss_mb():
+    if resource is None:
+        return float("nan")
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(index, name, queries):
+    timings = []
+    matches = []
+    for query, filters in queries:
+        started = time.perf_counter()
+        total, _ = index.search(query, limit=20, **filters)
+        timings.append((time.perf_counter() - started) * 1000)
+        matches.append(total)
+    timings.sort()
+    print(
+        f"{name:<22} p50 {percentile(timings, 0.50):8.2f} ms  p95 {percentile(timings, 0.95):8.2f} ms  "
+        f"p99 {percentile(timings, 0.99):8.2f} ms  median matches {int(statistics.median(matches))}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /questions/search on a synthetic bank")
+    parser.add_argument("--questions", type=int, default=1_000_000, help="synthetic bank size")
+    parser.add_argument("--queries", type=int, default=100, help="queries per scenario")
+    parser.add_argument("--bank", default="interview_ques.json", help="real bank to take the vocabulary from")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.bank)
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    samples = {}
+    index = QuestionSearchIndex(synthetic_entries(args.questions, words, rng, samples))
+    print(f"Indexed {index.size:,} questions ({len(words)} word vocabulary) in "
+          f"{time.perf_counter() - started:.1f}s, peak RSS +{rss_mb() - rss_before:.0f} MB")
+
+    # Rarer words make realistic queries; the most frequent ones are the worst case.
+    # Filtered queries take their terms from a question in the slice, or most would match nothing.
+    rare = words[len(words) // 4:]
+    areas = sorted(samples)
+    scenarios = {
+        "two rare terms": [(" ".join(rng.sample(rare, 2)), {}) for _ in range(args.queries)],
+        "prefix (3 chars)": [(rng.choice(rare)[:3] + "*", {}) for _ in range(args.queries)],
+        "role + level filter": [
+            (slice_terms(samples, rng, 2, area), {"role": area[0], "level": area[1]})
+            for area in (rng.choice(areas) for _ in range(args.queries))
+        ],
+        "competency filter": [
+            (slice_terms(samples, rng, 1, area), {"role": area[0], "level": area[1], "competency": area[2]})
+            for area in (rng.choice(areas) for _ in range(args.queries))
+        ],
+        "most frequent term": [(words[0], {}) for _ in range(max(5, args.queries // 10))],
+    }
+    for name, queries in scenarios.items():
+        run(index, name, queries)
+
+
+if __name__ == "__main__":
+    main()
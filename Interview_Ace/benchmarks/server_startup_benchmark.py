@@ -0,0 +1,204 @@
+# server_startup_benchmark.py
+"""Startup time and per-worker memory of the gunicorn setup, with and without preload.
+
+Starts gunicorn from gunicorn.conf.py against the fake Gemini backend and the
+in-memory user store, once with GUNICORN_PRELOAD=1 and once with 0, and
+reports:
+
+    ready      seconds from launch until every worker has warmed its state
+               and /health answers
+    RSS        resident memory per worker, shared pages included
+    PSS        proportional share: shared pages split between their users,
+               so the sum over all processes is the real footprint
+    private    pages only that worker holds (what a new worker really costs)
+
+Memory is read from /proc/<pid>/smaps_rollup (Linux) right after startup
+and again after --requests manual submissions and searches, since traffic
+dirties shared pages.
+
+    python benchmarks/server_startup_benchmark.py --workers 4 --requests 200
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+
+BOOTED = "Booting worker with pid: "
+WARMED = "Warmed shared state"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid):
+    """{"rss", "pss", "private"} in kB for a process"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                fields[name] = int(rest.split()[0])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+class Server:
+    """A gunicorn master started from gunicorn.conf.py, with its log watched for readiness"""
+
+    def __init__(self, workers, preload, port):
+        self.workers = workers
+        self.preload = preload
+        self.port = port
+        self.worker_pids = []
+        self.warmed = 0
+        self._lines = threading.Condition()
+        env = dict(
+            os.environ,
+            GEMINI_BACKEND="fake",
+            MONGO_BACKEND="memory",
+            WEB_CONCURRENCY=str(workers),
+            GUNICORN_BIND=f"127.0.0.1:{port}",
+            GUNICORN_PRELOAD="1" if preload else "0",
+        )
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn"], cwd=APP_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        for line in self.process.stderr:
+            with self._lines:
+                if BOOTED in line:
+                    self.worker_pids.append(int(line.rsplit(BOOTED, 1)[1]))
+                elif WARMED in line:
+                    self.warmed += 1
+                self._lines.notify_all()
+
+    def wait_ready(self, timeout=120):
+        """Seconds from launch until every worker is warm and /health answers"""
+        # Preloading warms once in the master; otherwise each worker warms itself
+        expected_warm = 1 if self.preload else self.workers
+        deadline = time.monotonic() + timeout
+        with self._lines:
+            while len(self.worker_pids) < self.workers or self.warmed < expected_warm:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start; run it by hand to see why")
+                self._lines.wait(0.05)
+        while request(self.port, "GET", "/health")[0] != 200:
+            time.sleep(0.01)
+        return time.perf_counter() - self.started
+
+    def memory(self):
+        return memory_kb(self.process.pid), [memory_kb(pid) for pid in self.worker_pids]
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def request(port, method, path, body=None, cookie=None):
+    """(status, Set-Cookie) of one request on a fresh connection"""
+    headers = {"Content-Type": "application/json"}
+    if cookie:
+        headers["Cookie"] = cookie
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, response.getheader("Set-Cookie")
+    except OSError:
+        return None, None
+    finally:
+        connection.close()
+
+
+def drive_traffic(port, count):
+    """Send count requests, alternating manual submissions and searches; returns failures"""
+    status, set_cookie = request(port, "POST", "/register", {
+        "name": "Benchmark User", "email": f"bench-{time.time_ns()}@example.com", "password": "benchmark"
+    })
+    if status != 200:
+        raise RuntimeError(f"Registration failed with status {status}")
+    cookie = set_cookie.split(";", 1)[0]
+    failures = 0
+    for n in range(count):
+        if n % 2:
+            status, _ = request(port, "GET", "/questions/search?q=data+model", cookie=cookie)
+        else:
+            status, _ = request(port, "POST", "/submit-manual", {
+                "role": "Data Scientist", "level": "Junior", "name": "Benchmark User", "seed": n
+            }, cookie=cookie)
+        failures += status != 200
+    return failures
+
+
+def measure(workers, preload, requests):
+    server = Server(workers, preload, free_port())
+    try:
+        ready = server.wait_ready()
+        idle = server.memory()
+        failures = drive_traffic(server.port, requests) if requests else 0
+        loaded = server.memory()
+    finally:
+        server.stop()
+    return {"preload": preload, "ready_s": round(ready, 2), "idle": idle, "loaded": loaded, "failures": failures}
+
+
+def summarize(snapshot):
+    master, workers = snapshot
+    mean = {key: sum(w[key] for w in workers) / len(workers) / 1024 for key in ("rss", "pss", "private")}
+    total_pss = (master["pss"] + sum(w["pss"] for w in workers)) / 1024
+    return mean, total_pss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="requests sent before the second measurement")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("Needs Linux /proc/<pid>/smaps_rollup", file=sys.stderr)
+        return 1
+
+    results = [measure(args.workers, preload, args.requests) for preload in (True, False)]
+
+    print(f"{args.workers} workers; memory in MiB, per worker unless noted")
+    print(f"{'preload':<8} {'ready s':>8} {'when':<14} {'RSS':>7} {'PSS':>7} {'private':>8} {'total PSS':>10}")
+    for result in results:
+        for when in ("idle", "loaded"):
+            mean, total = summarize(result[when])
+            label = "after startup" if when == "idle" else f"after {args.requests} req"
+            print(f"{'yes' if result['preload'] else 'no':<8} {result['ready_s']:>8} {label:<14} "
+                  f"{mean['rss']:>7.1f} {mean['pss']:>7.1f} {mean['private']:>8.1f} {total:>10.1f}")
+    if any(result["failures"] for result in results):
+        print("Some requests failed; see the gunicorn output by running it by hand", file=sys.stderr)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"workers": args.workers, "requests": args.requests, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
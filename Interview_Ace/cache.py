@@ -0,0 +1,281 @@
+# cache.py
+"""Small caching building blocks shared by the parsing and generation paths.
+
+LRUCache is an in-process, thread-safe LRU. SQLiteCache persists JSON
+values in a local SQLite file so entries survive restarts and are shared by
+every worker on the host. TieredCache puts the former in front of the latter.
+
+Every cache can optionally expire entries after ``ttl`` seconds and bound its
+size with ``max_bytes`` (values are measured by their JSON encoding), evicting
+the least recently used entries first. Each keeps hit/miss counters.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def json_size(value):
+    """Approximate size of a value in bytes, as stored by SQLiteCache"""
+    return len(json.dumps(value).encode("utf-8"))
+
+
+class LRUCache:
+    """Thread-safe in-memory cache that evicts the least recently used entry"""
+
+    def __init__(self, max_entries=256, ttl=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, created_at=None):
+        """Store value; created_at (a time.time() timestamp) backdates an entry copied from elsewhere"""
+        size = json_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = None
+        if self.ttl:
+            age = max(0.0, time.time() - created_at) if created_at is not None else 0.0
+            if age >= self.ttl:
+                return
+            expires_at = time.monotonic() + self.ttl - age
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._data), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Persistent key/value cache in a SQLite file; values must be JSON-serializable.
+
+    Reads refresh an entry's accessed_at, and once the table grows past
+    max_bytes the least recently accessed rows are deleted until it is back
+    under 90% of the limit. The table's total size is kept in a one-row
+    {table}_size table by triggers, so writes from every process sharing the
+    file keep it current and a set only scans the table when over budget.
+    """
+
+    def __init__(self, path, table="cache", ttl=None, max_bytes=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Columns added after the first release; older cache files are upgraded in place
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+            if "accessed_at" not in columns:
+                conn.execute(f"ALTER TABLE {self.table} ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            if "size" not in columns:
+                conn.execute(f"ALTER TABLE {self.table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)"
+            )
+            self._create_size_total(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _create_size_total(self, conn):
+        # Created in the same write transaction as the initial SUM, so no write is missed
+        table = self.table
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_size ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_insert AFTER INSERT ON {table} BEGIN "
+            f"UPDATE {table}_size SET total = total + NEW.size WHERE id = 0; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_update AFTER UPDATE OF size ON {table} BEGIN "
+            f"UPDATE {table}_size SET total = total - OLD.size + NEW.size WHERE id = 0; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_delete AFTER DELETE ON {table} BEGIN "
+            f"UPDATE {table}_size SET total = total - OLD.size WHERE id = 0; END"
+        )
+        conn.execute(
+            f"INSERT OR IGNORE INTO {table}_size (id, total) "
+            f"SELECT 0, COALESCE(SUM(size), 0) FROM {table}"
+        )
+
+    def _total_size(self, conn):
+        return conn.execute(f"SELECT total FROM {self.table}_size WHERE id = 0").fetchone()[0]
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection opened before a fork (gunicorn preload) must not be used by the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else default
+
+    def get_entry(self, key):
+        """Return (value, created_at) for a live entry, or None"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and row[1] + self.ttl <= now:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed ({self.path}): {e}")
+            return None
+        if not row:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value):
+        encoded = json.dumps(value)
+        size = len(encoded.encode("utf-8"))
+        now = time.time()
+        try:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the size trigger
+            self._connect().execute(
+                f"INSERT INTO {self.table} (key, value, created_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, created_at = excluded.created_at, "
+                "accessed_at = excluded.accessed_at, size = excluded.size",
+                (key, encoded, now, now, size),
+            )
+            if self.max_bytes:
+                self._evict(now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed ({self.path}): {e}")
+
+    def _evict(self, now):
+        conn = self._connect()
+        if self._total_size(conn) <= self.max_bytes:
+            return
+        # Expired rows go first; reads already ignore them, so they are only purged here
+        if self.ttl:
+            conn.execute(f"DELETE FROM {self.table} WHERE created_at <= ?", (now - self.ttl,))
+        total = self._total_size(conn)
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+        logger.info(f"Evicted {len(victims)} entries from {self.path}:{self.table}")
+
+    def clear(self):
+        self._connect().execute(f"DELETE FROM {self.table}")
+
+    def stats(self):
+        try:
+            conn = self._connect()
+            entries = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            size = self._total_size(conn)
+        except sqlite3.Error:
+            entries = size = None
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional persistent cache.
+
+    An entry promoted from the persistent tier keeps its original created_at,
+    so copying it into memory does not extend its TTL.
+    """
+
+    def __init__(self, memory, persistent=None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.persistent is not None:
+            entry = self.persistent.get_entry(key)
+            if entry is not None:
+                value, created_at = entry
+                self.memory.set(key, value, created_at=created_at)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self):
+        stats = {"memory": self.memory.stats()}
+        if self.persistent is not None:
+            stats["persistent"] = self.persistent.stats()
+        return stats
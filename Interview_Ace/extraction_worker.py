@@ -0,0 +1,58 @@
+# extraction_worker.py
+"""Entry point of the resume text extraction processes run by resume_parser.ExtractionPool.
+
+    python extraction_worker.py <socket fd> <memory cap in MB>
+
+The pool starts this file as its own script instead of going through
+multiprocessing, which would re-import the parent's __main__ in every
+worker: under `python app.py` that is a Mongo client, a Flask app and a
+JobManager per extractor. Here the worker imports resume_parser and
+nothing else of the app. Requests arrive as (data, file_ext, max_pages)
+over the inherited socket and each is answered with (ok, text or error).
+"""
+import sys
+from multiprocessing.connection import Connection
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+from resume_parser import extract_text
+
+
+def limit_memory(memory_mb):
+    """Cap the worker's address space so a hostile document cannot exhaust the host"""
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def serve(conn):
+    """Receive a document, send back its text, until the pool closes the connection"""
+    while True:
+        try:
+            data, file_ext, max_pages = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send((True, extract_text(data, file_ext, max_pages)))
+        except MemoryError:
+            conn.send((False, "Resume is too large to process"))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+def main(argv=None):
+    fd, memory_mb = (sys.argv[1:] if argv is None else argv)
+    limit_memory(int(memory_mb))
+    serve(Connection(int(fd)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
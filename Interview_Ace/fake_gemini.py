@@ -0,0 +1,245 @@
+# fake_gemini.py
+"""Local stand-in for google.generativeai.GenerativeModel.
+
+Used for tests and offline batch jobs so no Gemini quota is spent. It answers
+the numbered questions found in a prompt built by granite.format_prompt_for_granite
+in the same numbered format the real model is asked to produce.
+
+For load tests it can also behave like a busy upstream, configured from the
+environment:
+
+    FAKE_GEMINI_LATENCY       time to first token: "0", "fixed:MS",
+                              "uniform:LOW_MS,HIGH_MS" or "lognormal:MEDIAN_MS,SIGMA"
+    FAKE_GEMINI_MS_PER_TOKEN  extra time per output token (streamed per chunk)
+    FAKE_GEMINI_ERROR_RATE    share of calls failing with 503 Service Unavailable
+    FAKE_GEMINI_TRUNCATE_RATE share of calls cut short with finish reason MAX_TOKENS
+    FAKE_GEMINI_SEED          seed for the latency/error/truncation draws
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+QUESTION_LINE = re.compile(r'^(\d+)\.\s+(.+)$', re.MULTILINE)
+SINGLE_QUESTION_LINE = re.compile(r'^Question:\s*(.+)$', re.MULTILINE)
+STREAM_CHUNK_SIZE = 40
+# Present in granite.format_json_prompt_for_granite prompts
+JSON_PROMPT_MARKER = "Respond with JSON only"
+# Rough English average, used to emulate token limits and usage counts
+CHARS_PER_TOKEN = 4
+
+
+class LatencyModel:
+    """Draws simulated upstream latencies (seconds) from a configured distribution"""
+
+    KINDS = ("fixed", "uniform", "lognormal")
+
+    def __init__(self, kind="fixed", params=(0.0,)):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {', '.join(self.KINDS)}")
+        expected = 1 if kind == "fixed" else 2
+        if len(params) != expected:
+            raise ValueError(f"{kind} latency takes {expected} parameter(s), got {len(params)}")
+        self.kind = kind
+        self.params = tuple(float(p) for p in params)
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse a FAKE_GEMINI_LATENCY spec; a bare number is a fixed latency in ms"""
+        spec = (spec or "0").strip().lower()
+        kind, _, raw = spec.partition(":")
+        if not raw:
+            kind, raw = "fixed", kind
+        params = [float(p) for p in raw.split(",") if p.strip()]
+        return cls(kind, params)
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        else:
+            median, sigma = self.params
+            ms = median * rng.lognormvariate(0.0, sigma) if median > 0 else 0.0
+        return max(ms, 0.0) / 1000.0
+
+    def __repr__(self):
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+class FakeBehavior:
+    """Latency, failure and truncation settings of a FakeGenerativeModel"""
+
+    def __init__(self, latency=None, ms_per_token=0.0, error_rate=0.0, truncate_rate=0.0, seed=None):
+        self.latency = latency or LatencyModel()
+        self.ms_per_token = ms_per_token
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        seed = os.getenv("FAKE_GEMINI_SEED")
+        return cls(
+            latency=LatencyModel.parse(os.getenv("FAKE_GEMINI_LATENCY", "0")),
+            ms_per_token=float(os.getenv("FAKE_GEMINI_MS_PER_TOKEN", "0")),
+            error_rate=float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0")),
+            truncate_rate=float(os.getenv("FAKE_GEMINI_TRUNCATE_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    def draw(self):
+        """(first token delay in seconds, fail?, truncate at fraction or None) for one call"""
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            fail = self._rng.random() < self.error_rate
+            cut = self._rng.uniform(0.3, 0.9) if self._rng.random() < self.truncate_rate else None
+        return delay, fail, cut
+
+    def __repr__(self):
+        return (f"FakeBehavior(latency={self.latency!r}, ms_per_token={self.ms_per_token:g}, "
+                f"error_rate={self.error_rate:g}, truncate_rate={self.truncate_rate:g})")
+
+
+class FakeCandidate:
+    def __init__(self, finish_reason):
+        self.finish_reason = finish_reason
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Minimal response object exposing the attributes gemini_api reads"""
+
+    def __init__(self, text, finish_reason="STOP", prompt_tokens=0):
+        self.text = text
+        self.candidates = [FakeCandidate(finish_reason)]
+        self.usage_metadata = FakeUsageMetadata(prompt_tokens, estimate_tokens(text))
+
+
+class FakeGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel that never leaves the process"""
+
+    def __init__(self, model_name="fake-gemini", generation_config=None, behavior=None):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.behavior = behavior or FakeBehavior.from_env()
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        delay, fail, cut = self.behavior.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise google_exceptions.ServiceUnavailable("Fake Gemini: simulated overload")
+
+        text, finish_reason = self._answer(prompt, generation_config, cut)
+        if stream:
+            return self._stream(text, finish_reason)
+        self._generation_delay(text)
+        return FakeResponse(text, finish_reason, estimate_tokens(prompt))
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None):
+        """Like generate_content, but waits on the event loop instead of blocking a thread.
+
+        With stream=True the awaited result is an async iterator of chunks, as in the SDK.
+        """
+        delay, fail, cut = self.behavior.draw()
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            raise google_exceptions.ServiceUnavailable("Fake Gemini: simulated overload")
+
+        text, finish_reason = self._answer(prompt, generation_config, cut)
+        if stream:
+            return self._stream_async(text, finish_reason)
+        await self._generation_delay_async(text)
+        return FakeResponse(text, finish_reason, estimate_tokens(prompt))
+
+    def _answer(self, prompt, generation_config, cut):
+        """(text, finish reason) for a prompt, after the token limit and any simulated truncation"""
+        config = dict(self.generation_config, **(generation_config or {}))
+        text = fake_answer_text(prompt)
+        finish_reason = "STOP"
+        # Honour max_output_tokens like the real model: stop mid-answer and say so
+        max_chars = config.get("max_output_tokens", 0) * CHARS_PER_TOKEN
+        if max_chars and len(text) > max_chars:
+            text, finish_reason = text[:max_chars], "MAX_TOKENS"
+        if cut is not None and len(text) > 1:
+            text, finish_reason = text[:max(1, int(len(text) * cut))], "MAX_TOKENS"
+        return text, finish_reason
+
+    def _generation_delay(self, text):
+        if self.behavior.ms_per_token:
+            time.sleep(estimate_tokens(text) * self.behavior.ms_per_token / 1000.0)
+
+    async def _generation_delay_async(self, text):
+        if self.behavior.ms_per_token:
+            await asyncio.sleep(estimate_tokens(text) * self.behavior.ms_per_token / 1000.0)
+
+    def _stream(self, text, finish_reason):
+        chunks = _stream_chunks(text)
+        for i, chunk in enumerate(chunks):
+            self._generation_delay(chunk)
+            yield FakeResponse(chunk, finish_reason if i == len(chunks) - 1 else None)
+
+    async def _stream_async(self, text, finish_reason):
+        chunks = _stream_chunks(text)
+        for i, chunk in enumerate(chunks):
+            await self._generation_delay_async(chunk)
+            yield FakeResponse(chunk, finish_reason if i == len(chunks) - 1 else None)
+
+
+def _stream_chunks(text):
+    return [text[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE)]
+
+
+def extract_prompt_questions(prompt):
+    """Return the numbered questions listed before the RESPONSE FORMAT section"""
+    return [question for _, question in extract_numbered_questions(prompt)]
+
+
+def extract_numbered_questions(prompt):
+    """Return (number, question) pairs listed before the RESPONSE FORMAT section"""
+    body = prompt.split("RESPONSE FORMAT:", 1)[0]
+    return [(int(number), question.strip()) for number, question in QUESTION_LINE.findall(body)]
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def fake_answer(question):
+    """Deterministic model answer for a single question"""
+    topic = question.rstrip("?.").split(".")[0][:120]
+    return (
+        f"A strong answer to \"{topic}\" describes a concrete situation, the approach taken "
+        "and the trade-offs considered. It closes with the measurable outcome and what was "
+        "learned from it."
+    )
+
+
+def fake_answer_text(prompt):
+    """Build a numbered answer block (or JSON array) for every question in the prompt"""
+    if JSON_PROMPT_MARKER in prompt:
+        return json.dumps([
+            {"index": number, "answer": fake_answer(question)}
+            for number, question in extract_numbered_questions(prompt)
+        ])
+    numbered = extract_numbered_questions(prompt)
+    if not numbered:
+        single = SINGLE_QUESTION_LINE.search(prompt)
+        if single:
+            return fake_answer(single.group(1).strip())
+        return "Hello, API is working!"
+    return "\n\n".join(f"{number}. {fake_answer(q)}" for number, q in numbered)
@@ -1,44 +1,298 @@
 # granite.py
 
+import bisect
+import hashlib
 import json
+import os
 import random
+import secrets
+import threading
+from datetime import datetime
 
-# ✅ Get questions for a specific role and level
-def get_questions_by_role_and_level(role, level, filepath="interview_ques.json", max_questions=10):
-    """Get questions for a role and level, limiting to max_questions"""
-    with open(filepath, "r") as f:
-        data = json.load(f)
+# How the sampling seed is chosen when the client does not send one: "daily" rotates once
+# a day per (role, level), "user" once a day per user, "random" gives every request a new seed
+QUESTION_SEED_MODE = os.getenv("QUESTION_SEED_MODE", "daily").lower()
+MAX_SEED = 2**31 - 1  # keeps seeds exact as JavaScript numbers
+# Share of a sample reserved for the questions most relevant to the candidate's skills
+SKILL_QUESTION_SHARE = float(os.getenv("SKILL_QUESTION_SHARE", "0.5"))
+
+
+def _normalize(name):
+    """Normalize a role or level name for lookups"""
+    return name.strip().lower()
+
+
+class CompetencySampler:
+    """Draws questions spread across competency areas in proportion to their weights.
+
+    Systematic (stratified) sampling over the cumulative area weights gives
+    every area the floor or ceiling of its share of k, so no area whose share
+    is at least one question gets skipped. Questions inside an area are drawn
+    with random.sample over an index range, so nothing is copied and a draw
+    costs O(k log C) for C areas, however large the bank is.
+    """
+
+    def __init__(self, size, areas):
+        """size: number of questions; areas: (start, end, weight) index ranges"""
+        self.size = size
+        self._bounds = []
+        self._cumulative = []
+        total = 0.0
+        for start, end, weight in areas:
+            if end > start and weight > 0:
+                total += weight
+                self._bounds.append((start, end))
+                self._cumulative.append(total)
+        self._total = total
+
+    def sample(self, k, rng=random):
+        """Return k distinct question indexes (all of them, in order, if k >= size)"""
+        if k >= self.size:
+            return list(range(self.size))
+        if not self._bounds:
+            return rng.sample(range(self.size), k)
+
+        counts = {}
+        step = self._total / k
+        point = rng.random() * step
+        last = len(self._bounds) - 1
+        for _ in range(k):
+            area = min(bisect.bisect_right(self._cumulative, point), last)
+            counts[area] = counts.get(area, 0) + 1
+            point += step
 
-    framework = data.get("qualitativeInterviewFramework", [])
-    all_questions = []
+        picked = []
+        overflow = 0
+        for area, count in counts.items():
+            start, end = self._bounds[area]
+            take = min(count, end - start)
+            overflow += count - take
+            picked.extend(rng.sample(range(start, end), take))
+
+        # Areas too small for their share: top up with any question not yet picked
+        if overflow:
+            chosen = set(picked)
+            while overflow:
+                index = rng.randrange(self.size)
+                if index not in chosen:
+                    chosen.add(index)
+                    picked.append(index)
+                    overflow -= 1
+
+        rng.shuffle(picked)
+        return picked
+
+
+class _CompiledBank:
+    """Immutable, lookup-ready snapshot of one version of the question file"""
+
+    def __init__(self, data):
+        roles = []
+        levels = {}
+        questions = {}
+        competencies = {}
+        sampling_areas = {}
+
+        for entry in data.get("qualitativeInterviewFramework", []):
+            role_key = _normalize(entry["role"])
+            roles.append(entry["role"])
+            # Like the original lookups, the first entry wins for levels
+            # while questions accumulate across duplicate role entries
+            levels.setdefault(role_key, tuple(lvl["level"] for lvl in entry["levels"]))
 
-    for entry in framework:
-        if entry["role"].lower() == role.lower():
             for lvl in entry["levels"]:
-                if lvl["level"].lower() == level.lower():
-                    for comp in lvl["competencyAreas"]:
-                        all_questions.extend(comp["qualitativeQuestionExamples"])
+                key = (role_key, _normalize(lvl["level"]))
+                flat = questions.setdefault(key, [])
+                comps = competencies.setdefault(key, [])
+                areas = sampling_areas.setdefault(key, [])
+                for comp in lvl["competencyAreas"]:
+                    start = len(flat)
+                    flat.extend(comp["qualitativeQuestionExamples"])
+                    comps.append((
+                        comp.get("competency", ""),
+                        start,
+                        len(flat),
+                        comp.get("whatInterviewerLooksFor", ""),
+                    ))
+                    areas.append((start, len(flat), float(comp.get("samplingWeight", 1.0))))
 
-    # If we have more questions than needed, randomly select max_questions
-    if len(all_questions) > max_questions:
-        all_questions = random.sample(all_questions, max_questions)
-    
-    return all_questions
+        self.roles = tuple(roles)
+        self.levels = levels
+        self.questions = {key: tuple(qs) for key, qs in questions.items()}
+        self.competencies = {key: tuple(cs) for key, cs in competencies.items()}
+        self.area_weights = {key: tuple(w for _, _, w in areas) for key, areas in sampling_areas.items()}
+        # Default samplers weight every competency area equally unless it sets samplingWeight
+        self.samplers = {
+            key: CompetencySampler(len(questions[key]), sampling_areas[key])
+            for key in questions
+        }
+
+
+class QuestionBank:
+    """Process-wide question bank that parses interview_ques.json once and
+    reloads it only when the file's mtime/size and content hash change.
+
+    A compiled snapshot (see bank_snapshot.py) of the same file content is
+    memory-mapped instead of parsing the JSON.
+    """
+
+    def __init__(self, filepath="interview_ques.json", snapshot_path=None):
+        self.filepath = filepath
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._digest = None
+        self._compiled = None
+
+    def _current(self):
+        """Return the compiled bank, reloading it if the file changed on disk"""
+        stat = os.stat(self.filepath)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        compiled = self._compiled
+        if stamp == self._stamp and compiled is not None:
+            return compiled
+
+        with self._lock:
+            if stamp == self._stamp and self._compiled is not None:
+                return self._compiled
+
+            snapshot = self._load_snapshot()
+            if snapshot is not None and snapshot.source_stamp == stamp:
+                # The snapshot was compiled from this very file: no need to read the JSON
+                self._compiled, self._digest, self._stamp = snapshot, snapshot.source_digest, stamp
+                return self._compiled
+
+            with open(self.filepath, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+
+            # A touched but unchanged file keeps the existing compiled bank
+            if digest != self._digest or self._compiled is None:
+                if snapshot is not None and snapshot.source_digest == digest:
+                    self._compiled = snapshot
+                else:
+                    self._compiled = _CompiledBank(json.loads(raw))
+                self._digest = digest
+            self._stamp = stamp
+            return self._compiled
+
+    def _load_snapshot(self):
+        """The compiled snapshot of the question file, if one has been built"""
+        from bank_snapshot import load_snapshot, snapshot_path_for
+        return load_snapshot(self.snapshot_path or snapshot_path_for(self.filepath))
+
+    @property
+    def digest(self):
+        """SHA-256 of the currently loaded question file"""
+        self._current()
+        return self._digest
+
+    def roles(self):
+        return list(self._current().roles)
+
+    def levels(self, role):
+        return list(self._current().levels.get(_normalize(role), ()))
+
+    def questions(self, role, level):
+        """All questions for a role and level as a flat tuple"""
+        return self._current().questions.get((_normalize(role), _normalize(level)), ())
+
+    def competencies(self, role, level):
+        """(competency, start, end, whatInterviewerLooksFor) tuples indexing into questions()"""
+        return self._current().competencies.get((_normalize(role), _normalize(level)), ())
+
+    def sample(self, role, level, k, rng=random, weights=None, preferred=()):
+        """Up to k questions stratified across competency areas.
+
+        weights maps competency names to relative weights and overrides the
+        bank's samplingWeight values for this draw; unnamed areas weigh 1.
+        preferred question indexes are taken first and the rest is sampled.
+        """
+        compiled = self._current()
+        key = (_normalize(role), _normalize(level))
+        questions = compiled.questions.get(key, ())
+        if weights:
+            sampler = CompetencySampler(len(questions), [
+                (start, end, float(weights.get(name, 1.0)))
+                for name, start, end, _ in compiled.competencies.get(key, ())
+            ])
+        else:
+            sampler = compiled.samplers.get(key)
+        if sampler is None:
+            return []
+
+        picked = list(preferred[:k])
+        if picked:
+            chosen = set(picked)
+            # The sampler returns distinct indexes, so k draws always leave enough unchosen ones
+            picked += [i for i in sampler.sample(k, rng) if i not in chosen][:k - len(picked)]
+            rng.shuffle(picked)
+        else:
+            picked = sampler.sample(k, rng)
+        return [questions[i] for i in picked]
+
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def get_question_bank(filepath="interview_ques.json"):
+    """Return the shared QuestionBank for a question file"""
+    bank = _banks.get(filepath)
+    if bank is None:
+        with _banks_lock:
+            bank = _banks.setdefault(filepath, QuestionBank(filepath))
+    return bank
+
+def _hash_seed(*parts):
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") & MAX_SEED
+
+# ✅ Pick the sampling seed for a request
+def question_seed(role, level, user_id=None, mode=None, day=None):
+    """Seed for get_questions_by_role_and_level according to QUESTION_SEED_MODE.
+
+    Shared seeds make identical prompts, so the Gemini caches and request
+    coalescing can serve them; day (a date, default today in UTC) rotates them.
+    """
+    mode = mode or QUESTION_SEED_MODE
+    day = day or datetime.utcnow().date()
+    if mode == "random":
+        return secrets.randbelow(MAX_SEED + 1)
+    if mode == "user" and user_id:
+        return _hash_seed("user", user_id, day.isoformat())
+    return _hash_seed("daily", _normalize(role), _normalize(level), day.isoformat())
+
+# ✅ Get questions for a specific role and level
+def get_questions_by_role_and_level(role, level, filepath="interview_ques.json", max_questions=10,
+                                    seed=None, weights=None, skills=None):
+    """Get questions for a role and level, limiting to max_questions.
+
+    The sample is spread across the level's competency areas (see
+    CompetencySampler), optionally weighted per competency name. Given the
+    candidate's skills, up to SKILL_QUESTION_SHARE of the sample are the
+    questions most relevant to them. With a seed the same (role, level,
+    seed, skills) always yields the same questions in the same order;
+    without one the sample is random.
+    """
+    rng = random
+    if seed is not None:
+        # String seeding is stable across processes and Python versions
+        rng = random.Random(f"{seed}\x1f{_normalize(role)}\x1f{_normalize(level)}")
+
+    preferred = ()
+    if skills and SKILL_QUESTION_SHARE > 0:
+        from skill_index import get_skill_index
+        preferred = get_skill_index(filepath).rank(role, level, skills, int(max_questions * SKILL_QUESTION_SHARE))
+    return get_question_bank(filepath).sample(role, level, max_questions, rng, weights, preferred)
 
 # ✅ Get all available roles
 def get_all_roles(filepath="interview_ques.json"):
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    return [item["role"] for item in data.get("qualitativeInterviewFramework", [])]
+    return get_question_bank(filepath).roles()
 
 # ✅ Get all levels for a given role
 def get_levels_for_role(role, filepath="interview_ques.json"):
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    for item in data.get("qualitativeInterviewFramework", []):
-        if item["role"].lower() == role.lower():
-            return [lvl["level"] for lvl in item["levels"]]
-    return []
+    return get_question_bank(filepath).levels(role)
 
 # ✅ Format a prompt to send to Gemini with better structure
 def format_prompt_for_granite(role, level, questions):
@@ -75,4 +329,63 @@ Answer each question in this exact format:
 
 Remember: Keep answers professional, practical, and appropriate for a {level} {role} candidate."""
     
+    return prompt
+
+# ✅ Format a short prompt for a single question (used by the fan-out mode)
+def format_single_question_prompt(role, level, question):
+    """Create a prompt asking Gemini to answer exactly one question"""
+    return f"""You are an expert interview coach preparing a model answer for a {level} {role} candidate.
+
+Answer the interview question below in 2-3 concise, professional sentences with practical examples and specific details, using a {level.lower()} level of technical depth.
+Reply with the answer text only - no numbering, headings or markdown.
+
+Question: {question}"""
+
+# ✅ Format a follow-up prompt for answers a truncated response did not reach
+def format_continuation_prompt(role, level, numbered_questions):
+    """Ask only for the given (number, question) pairs, keeping their original numbers"""
+    prompt = f"""You are an expert interview coach preparing model answers for a {level} {role} candidate.
+
+Your previous response was cut off. Provide concise, professional answers (2-3 sentences each,
+with practical examples and specific details) for ONLY the following questions:
+
+"""
+    for number, question in numbered_questions:
+        prompt += f"{number}. {question}\n"
+
+    prompt += """
+RESPONSE FORMAT:
+Answer each question using its number exactly as given above, for example:
+
+7. [Your concise answer for question 7]"""
+
+    return prompt
+
+# ✅ Format a prompt asking for schema-constrained JSON answers
+def format_json_prompt_for_granite(role, level, numbered_questions):
+    """Create a prompt whose answer is a JSON array of {"index", "answer"} objects.
+
+    numbered_questions is a list of (index, question) pairs; indexes are kept
+    as given so a follow-up request for a few missing answers reuses them.
+    """
+    prompt = f"""You are an expert interview coach preparing model answers for a {level} {role} candidate.
+
+IMPORTANT INSTRUCTIONS:
+- Provide concise, professional answers (2-3 sentences each)
+- Answer each question with practical examples and specific details
+- Use a {level.lower()} level of technical depth
+
+Please provide model answers for the following {len(numbered_questions)} interview questions:
+
+"""
+    for index, question in numbered_questions:
+        prompt += f"{index}. {question}\n"
+
+    prompt += """
+RESPONSE FORMAT:
+Respond with JSON only - no markdown fences or commentary. The response must be an array
+with exactly one object per question, using the question's number as "index":
+
+[{"index": 1, "answer": "Your concise answer for question 1"}, ...]"""
+
     return prompt
\ No newline at end of file
@@ -0,0 +1,131 @@
+# gunicorn.conf.py
+"""gunicorn settings for production; picked up automatically when gunicorn starts in this directory.
+
+    gunicorn                                   # gthread workers serving wsgi:app
+    GUNICORN_WORKLOAD=async gunicorn           # uvicorn workers serving asgi:app
+
+GUNICORN_WORKLOAD picks the worker model:
+
+    io      (default) gthread: each worker serves GUNICORN_THREADS requests at
+            once. Requests spend nearly all their time waiting on Gemini, and
+            resume text extraction already runs in its own processes.
+    gevent  greenlets, GUNICORN_CONNECTIONS per worker (needs gevent installed)
+    async   uvicorn workers running asgi:app; Gemini calls are awaited (needs uvicorn)
+    cpu     sync workers, one request per process: for hosts where the
+            extraction pool is off (EXTRACT_WORKERS=0) and parsing dominates
+
+Except under gevent, the app is preloaded and warmed in the master
+(wsgi.warm_up), so workers fork with the question bank, indexes and
+compiled patterns already built and share them copy-on-write. Timeouts follow the Gemini deadlines: a
+worker is only killed, and a restart only cuts a request short, once the
+request has outlived everything the answer pipeline is allowed to spend.
+Workers are recycled after GUNICORN_MAX_REQUESTS requests (jittered so
+they don't all restart together) to contain slow leaks.
+"""
+import multiprocessing
+import os
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def _installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def request_budget():
+    """Worst-case seconds a processing request may legitimately run, from the app's own limits.
+
+    Read from the same environment variables (and defaults) as resume_parser,
+    gemini_api and answer_pipeline, so the master doesn't import the app just
+    to configure itself.
+    """
+    extract = _env_float("EXTRACT_TIMEOUT", "15")
+    mode = os.getenv("ANSWER_MODE", "batch").lower()
+    if mode == "fanout":
+        # Every question is asked at once and the request waits at most this long
+        generation = _env_float("GEMINI_FANOUT_TIMEOUT", "30")
+    else:
+        # One call plus its follow-ups, each bounded by the per-call deadline (retries included)
+        followups = int(os.getenv("JSON_MAX_REPAIRS" if mode == "json" else "MAX_CONTINUATIONS", "2"))
+        generation = (1 + followups) * _env_float("GEMINI_DEADLINE", "90")
+    return extract + generation
+
+
+CPUS = multiprocessing.cpu_count()
+WORKLOAD = os.getenv("GUNICORN_WORKLOAD", "io").lower()
+if WORKLOAD not in ("io", "gevent", "async", "cpu"):
+    raise ValueError(f"GUNICORN_WORKLOAD must be io, gevent, async or cpu, not {WORKLOAD!r}")
+
+# Explained in on_starting when a requested worker model can't be used
+_fallback = None
+if WORKLOAD == "gevent" and not _installed("gevent"):
+    _fallback, WORKLOAD = "gevent is not installed; using gthread workers", "io"
+if WORKLOAD == "async" and not _installed("uvicorn"):
+    _fallback, WORKLOAD = "uvicorn is not installed; using gthread workers", "io"
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+wsgi_app = "asgi:app" if WORKLOAD == "async" else "wsgi:app"
+workers = int(os.getenv("WEB_CONCURRENCY", str(CPUS)))
+
+if WORKLOAD == "io":
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "16"))
+elif WORKLOAD == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "256"))
+elif WORKLOAD == "async":
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    worker_class = "sync"
+
+# gevent patches the standard library in each worker after the fork; an app preloaded
+# in the master would already hold unpatched sockets, locks and threads
+preload_app = WORKLOAD != "gevent" and os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# For sync workers this bounds each request; threaded and async workers only miss it when stuck
+timeout = int(os.getenv("GUNICORN_TIMEOUT", str(int(request_budget()) + 10)))
+# On restart, recycling or SIGTERM, in-flight generations get their whole budget to finish
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", str(timeout)))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+# Heartbeat files on tmpfs, so a slow disk can't make healthy workers look hung
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def on_starting(server):
+    if _fallback:
+        server.log.warning(_fallback)
+    if WORKLOAD == "gevent" and os.getenv("GUNICORN_PRELOAD", "1") == "1":
+        server.log.info("gevent workers import the app after monkey patching; preload is off")
+    threads_note = f" x {threads} threads" if worker_class == "gthread" else ""
+    server.log.info(
+        f"Workload {WORKLOAD}: {workers} {worker_class} workers{threads_note}, "
+        f"timeout {timeout}s, graceful {graceful_timeout}s, "
+        f"recycled after {max_requests}+/-{max_requests_jitter} requests"
+    )
+
+
+def when_ready(server):
+    # Runs in the master after the preload and before the first worker is forked
+    if preload_app:
+        from wsgi import warm_up
+        warm_up(freeze=True)
+
+
+def post_worker_init(worker):
+    if worker_class == "gevent":
+        # gRPC (the Gemini SDK's transport) must cooperate with the patched sockets
+        import grpc.experimental.gevent
+        grpc.experimental.gevent.init_gevent()
+    if not preload_app:
+        from wsgi import warm_up
+        warm_up()
@@ -0,0 +1,208 @@
+# jobs.py
+"""Background job execution for long-running requests.
+
+A POST can hand its work to the JobManager and return a job id straight
+away; the work runs on a bounded thread pool and clients poll the job for
+its status and result. Job records live in a JobStore: MongoJobStore shares
+them between all web workers, MemoryJobStore is for single-process setups.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from metrics import begin_request, in_current_context
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_TTL = int(os.getenv("JOB_TTL", "900"))  # seconds a job record is kept after creation
+# Jobs die with the worker that runs them (restart, max_requests recycling, crash). Every
+# process refreshes heartbeat_at on its queued and running jobs this often; a job whose
+# heartbeat is older than JOB_STALE_AFTER is reported as failed.
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "10"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", str(JOB_HEARTBEAT * 3)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class MemoryJobStore:
+    """Job records in a dict; only visible to the process that created them"""
+
+    def __init__(self, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._expire()
+            self._jobs[job["_id"]] = job
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def touch(self, job_ids, when):
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id]["heartbeat_at"] = when
+
+    def _expire(self):
+        now = datetime.utcnow()
+        for job_id in [k for k, job in self._jobs.items() if job["expires_at"] <= now]:
+            del self._jobs[job_id]
+
+
+class MongoJobStore:
+    """Job records in a MongoDB collection, expired by a TTL index"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    def _ensure_index(self):
+        if not self._indexed:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+    def create(self, job):
+        self._ensure_index()
+        self.collection.insert_one(job)
+
+    def update(self, job_id, **fields):
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def touch(self, job_ids, when):
+        self.collection.update_many({"_id": {"$in": list(job_ids)}}, {"$set": {"heartbeat_at": when}})
+
+
+class JobManager:
+    """Run callables in the background and track their outcome in a JobStore.
+
+    The callable must return a (payload, http_status) tuple, the same shape
+    the synchronous route would jsonify.
+    """
+
+    def __init__(self, store, workers=JOB_WORKERS, ttl=JOB_TTL, heartbeat=JOB_HEARTBEAT):
+        self.store = store
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._heartbeat_pid = None
+
+    def submit(self, owner, fn, *args):
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "owner": owner,
+            "status": QUEUED,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl),
+            "heartbeat_at": now,
+        }
+        self.store.create(job)
+        with self._lock:
+            self._in_flight.add(job["_id"])
+        self._ensure_heartbeat()
+        # A context of its own: the job's stage timings are collected apart from the request that queued it
+        self._executor.submit(in_current_context(self._run, job["_id"], fn, args))
+        return job["_id"]
+
+    def _run(self, job_id, fn, args):
+        try:
+            self._execute(job_id, fn, args)
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+    def _execute(self, job_id, fn, args):
+        started = time.monotonic()
+        timings = begin_request()
+        self.store.update(job_id, status=RUNNING, updated_at=datetime.utcnow())
+        try:
+            payload, http_status = fn(*args)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.update(
+                job_id, status=FAILED, error=str(e), stages_ms=timings.stages_ms(), updated_at=datetime.utcnow()
+            )
+            return
+        self.store.update(
+            job_id,
+            status=DONE,
+            result=payload,
+            http_status=http_status,
+            stages_ms=timings.stages_ms(),
+            updated_at=datetime.utcnow()
+        )
+        logger.info(f"Job {job_id} finished in {time.monotonic() - started:.2f}s")
+
+    def _ensure_heartbeat(self):
+        # One heartbeat thread per process; a worker forked from a preloaded master starts its own
+        with self._lock:
+            if self._heartbeat_thread is None or self._heartbeat_pid != os.getpid():
+                self._heartbeat_thread = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._heartbeat_pid = os.getpid()
+                self._heartbeat_thread.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat)
+            with self._lock:
+                job_ids = list(self._in_flight)
+            if not job_ids:
+                continue
+            try:
+                self.store.touch(job_ids, datetime.utcnow())
+            except Exception as e:
+                logger.error(f"Could not refresh job heartbeats: {e}")
+
+    def get(self, job_id, owner):
+        """Return the job record if it exists and belongs to owner"""
+        job = self.store.get(job_id)
+        if not job or job.get("owner") != owner:
+            return None
+        return job
+
+
+def is_stale(job, now=None, stale_after=JOB_STALE_AFTER):
+    """True for a queued or running job whose worker stopped refreshing its heartbeat"""
+    if job["status"] not in (QUEUED, RUNNING):
+        return False
+    beat = job.get("heartbeat_at") or job.get("updated_at") or job["created_at"]
+    return ((now or datetime.utcnow()) - beat).total_seconds() > stale_after
+
+
+def job_status(job):
+    """Client-facing view of a job record"""
+    status = {"jobId": job["_id"], "status": job["status"]}
+    if is_stale(job):
+        status["status"] = FAILED
+        status["error"] = "The job was interrupted by a server restart. Please submit it again."
+    elif job["status"] == DONE:
+        status["result"] = job.get("result")
+        status["httpStatus"] = job.get("http_status", 200)
+    elif job["status"] == FAILED:
+        status["error"] = job.get("error")
+    return status
@@ -0,0 +1,198 @@
+# memory_mongo.py
+"""In-process stand-in for the pymongo collections the app uses.
+
+Selected with MONGO_BACKEND=memory for local load tests and offline
+development. It implements only what app.py and jobs.py call (insert_one,
+find_one, update_one/update_many, create_index, count_documents), on
+top-level fields only:
+
+    filters  equality, or {"$in": [...]} for a field
+    updates  $set, $inc and $setOnInsert; upsert=True inserts the filter's
+             equality fields plus the update
+
+Anything else (dotted paths, other operators, replacement documents) raises
+ValueError rather than silently behaving differently from MongoDB. Data lives
+in the worker process: with several gunicorn workers each one has its own
+users, so clients should stay logged in through the session cookie rather
+than log in again.
+"""
+import copy
+import threading
+
+from bson.objectid import ObjectId
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+FILTER_OPERATORS = {"$in"}
+UPDATE_OPERATORS = {"$set", "$inc", "$setOnInsert"}
+
+
+def _check_field(field):
+    if not isinstance(field, str) or field.startswith("$") or "." in field:
+        raise ValueError(f"MemoryCollection supports top-level fields only, got {field!r}")
+
+
+def _is_operator(value):
+    return isinstance(value, dict) and any(str(key).startswith("$") for key in value)
+
+
+def _check_filter(filter):
+    for field, value in filter.items():
+        _check_field(field)
+        if _is_operator(value):
+            unsupported = set(value) - FILTER_OPERATORS
+            if unsupported:
+                raise ValueError(f"MemoryCollection filters support {sorted(FILTER_OPERATORS)}, got {sorted(unsupported)}")
+            if not isinstance(value["$in"], (list, tuple, set)):
+                raise ValueError(f"$in needs a list, got {type(value['$in']).__name__}")
+
+
+def _check_update(update):
+    if not update:
+        raise ValueError("Empty update document")
+    unsupported = set(update) - UPDATE_OPERATORS
+    if unsupported:
+        raise ValueError(f"MemoryCollection updates support {sorted(UPDATE_OPERATORS)}, got {sorted(unsupported)}")
+    for operator, fields in update.items():
+        for field, value in fields.items():
+            _check_field(field)
+            if operator == "$inc" and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"$inc needs a number for {field!r}, got {value!r}")
+
+
+def _field_matches(document, field, value):
+    if _is_operator(value):
+        return field in document and document[field] in value["$in"]
+    return document.get(field) == value
+
+
+def _matches(document, filter):
+    return all(_field_matches(document, field, value) for field, value in filter.items())
+
+
+def _apply(document, update, inserting=False):
+    """Apply a checked update document in place; returns whether anything changed"""
+    for field in update.get("$inc", {}):
+        current = document.get(field, 0)
+        if isinstance(current, bool) or not isinstance(current, (int, float)):
+            raise ValueError(f"Cannot $inc non-numeric field {field!r}")
+    before = copy.deepcopy(document)
+    document.update(copy.deepcopy(update.get("$set", {})))
+    if inserting:
+        document.update(copy.deepcopy(update.get("$setOnInsert", {})))
+    for field, amount in update.get("$inc", {}).items():
+        document[field] = document.get(field, 0) + amount
+    return document != before
+
+
+class MemoryCollection:
+    """Thread-safe list of documents with the subset of the pymongo Collection API in use"""
+
+    def __init__(self, name):
+        self.name = name
+        self._documents = {}  # _id -> document, in insertion order
+        self._lock = threading.Lock()
+
+    def _find_all(self, filter):
+        if set(filter) == {"_id"} and not _is_operator(filter["_id"]):
+            document = self._documents.get(filter["_id"])
+            return [document] if document is not None else []
+        return [document for document in self._documents.values() if _matches(document, filter)]
+
+    def _find(self, filter):
+        if set(filter) == {"_id"} and not _is_operator(filter["_id"]):
+            return self._documents.get(filter["_id"])
+        for document in self._documents.values():
+            if _matches(document, filter):
+                return document
+        return None
+
+    def _upsert(self, filter, update):
+        document = {field: copy.deepcopy(value) for field, value in filter.items() if not _is_operator(value)}
+        _apply(document, update, inserting=True)
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise ValueError(f"Duplicate _id {document['_id']!r} in {self.name}")
+        self._documents[document["_id"]] = document
+        return UpdateResult(0, 0, upserted_id=document["_id"])
+
+    def insert_one(self, document):
+        with self._lock:
+            document.setdefault("_id", ObjectId())
+            if document["_id"] in self._documents:
+                raise ValueError(f"Duplicate _id {document['_id']!r} in {self.name}")
+            self._documents[document["_id"]] = copy.deepcopy(document)
+        return InsertOneResult(document["_id"])
+
+    def find_one(self, filter=None):
+        filter = filter or {}
+        _check_filter(filter)
+        with self._lock:
+            document = self._find(filter)
+            return copy.deepcopy(document) if document is not None else None
+
+    def update_one(self, filter, update, upsert=False):
+        _check_filter(filter)
+        _check_update(update)
+        with self._lock:
+            document = self._find(filter)
+            if document is None:
+                return self._upsert(filter, update) if upsert else UpdateResult(0, 0)
+            return UpdateResult(1, int(_apply(document, update)))
+
+    def update_many(self, filter, update, upsert=False):
+        _check_filter(filter)
+        _check_update(update)
+        with self._lock:
+            documents = self._find_all(filter)
+            if not documents:
+                return self._upsert(filter, update) if upsert else UpdateResult(0, 0)
+            modified = sum(_apply(document, update) for document in documents)
+            return UpdateResult(len(documents), modified)
+
+    def create_index(self, keys, **kwargs):
+        # Lookups scan or hit _id directly; TTL indexes are not enforced
+        return keys if isinstance(keys, str) else "_".join(str(key) for key in keys)
+
+    def count_documents(self, filter):
+        _check_filter(filter)
+        with self._lock:
+            return sum(1 for document in self._documents.values() if _matches(document, filter))
+
+
+class MemoryDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+
+class MemoryMongoClient:
+    """Drop-in for MongoClient(uri) as far as client[db][collection] goes"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(name)
+            return self._databases[name]
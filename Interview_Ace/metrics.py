@@ -0,0 +1,225 @@
+# metrics.py
+"""Request and pipeline metrics in the Prometheus text exposition format.
+
+Counter and Histogram are small thread-safe collectors kept in REGISTRY and
+rendered by /metrics; prometheus_client is not a dependency. stage() times
+one step of a request (text extraction, question sampling, the Gemini call,
+answer parsing, ...): the duration always goes into the stage histogram, and
+when the current context belongs to a request started with begin_request()
+it is also added to that request's timings, which app.py sends back as a
+Server-Timing header. Work handed to a thread pool keeps counting towards
+the request when it is submitted through in_current_context().
+
+Values are per process: under gunicorn every worker keeps and serves its
+own, so scrape each worker or sum the series across workers.
+"""
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; Gemini calls and whole requests run into tens of seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_number(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_number(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "interview_ace_request_duration_seconds",
+    "Time from request start until the response (including any stream) was sent",
+    ("method", "route", "status")
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "interview_ace_stage_duration_seconds", "Time spent in each processing stage", ("stage",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "interview_ace_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")
+))
+GEMINI_ERRORS = REGISTRY.register(Counter(
+    "interview_ace_gemini_errors_total", "Failed Gemini attempts by error type", ("error",)
+))
+GEMINI_RETRIES = REGISTRY.register(Counter(
+    "interview_ace_gemini_retries_total", "Gemini attempts retried after a transient error"
+))
+GEMINI_RESPONSES = REGISTRY.register(Counter(
+    "interview_ace_gemini_responses_total", "Gemini responses by finish reason", ("finish_reason",)
+))
+GEMINI_TOKENS = REGISTRY.register(Counter(
+    "interview_ace_gemini_tokens_total", "Tokens reported by Gemini, by direction (prompt or output)", ("direction",)
+))
+PARSE_FALLBACKS = REGISTRY.register(Counter(
+    "interview_ace_parse_fallbacks_total", "Answer parses that needed a fallback", ("parser", "fallback")
+))
+
+
+class RequestTimings:
+    """Accumulated stage durations of one request, in the order stages first ran"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def stages_ms(self):
+        with self._lock:
+            return {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+
+    def server_timing(self):
+        """Server-Timing header value: every stage so far plus the total, in milliseconds"""
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def begin_request():
+    """Start collecting stage timings for the request handled in this context"""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current.get()
+
+
+def in_current_context(fn, *args, **kwargs):
+    """fn(*args, **kwargs) bound to a copy of the calling context, to hand to another thread.
+
+    Executor threads don't inherit context variables, so without this the
+    stages they time never reach the request's timings.
+    """
+    return functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as the named stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def render():
+    return REGISTRY.render()
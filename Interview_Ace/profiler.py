@@ -0,0 +1,218 @@
+# profiler.py
+"""Opt-in stack-sampling profiler for live requests.
+
+A request is profiled when it is picked at random (PROFILE_SAMPLE_RATE) or
+when it is still running after PROFILE_SLOW_MS. One background thread wakes
+every PROFILE_INTERVAL_MS and records the current stack of each request
+thread that qualifies, so nothing runs on the request threads themselves:
+unsampled requests only pay for a dict insert and removal, and only while
+the slow threshold is enabled. Slow requests are sampled from the moment
+they cross the threshold, which is where a spike spends its time.
+
+Each profile is written to PROFILE_DIR as a collapsed-stack file
+(``frame;frame;frame count`` per line, readable by flamegraph.pl or
+speedscope) with a JSON sidecar holding the route, status, trigger and
+stage timings. The oldest profiles are deleted once the directory holds
+more than PROFILE_MAX_FILES profiles or PROFILE_MAX_MB of data.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_MAX_MB = float(os.getenv("PROFILE_MAX_MB", "50"))
+# Frames deeper than this are cut from the root end of the stack
+MAX_STACK_DEPTH = 128
+
+ROUTE_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Root-first ';'-joined labels of a frame and its callers"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _ActiveRequest:
+    __slots__ = ("thread_id", "started", "sampled", "stacks", "samples")
+
+    def __init__(self, thread_id, sampled):
+        self.thread_id = thread_id
+        self.started = time.monotonic()
+        self.sampled = sampled
+        self.stacks = Counter()
+        self.samples = 0
+
+
+class RequestProfiler:
+    """Samples the stacks of chosen or slow requests and writes one profile per request"""
+
+    def __init__(self, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE, slow_ms=PROFILE_SLOW_MS,
+                 interval_ms=PROFILE_INTERVAL_MS, max_files=PROFILE_MAX_FILES, max_mb=PROFILE_MAX_MB):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000.0 if slow_ms > 0 else None
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self.max_files = max_files
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = sample_rate > 0 or self.slow_seconds is not None
+        self._active = {}  # id(_ActiveRequest) -> _ActiveRequest
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sampler = None
+        self._sampler_pid = None
+        self.written = 0
+
+    def begin(self):
+        """Register the request running on this thread; returns a handle for finish() or None"""
+        if not self.enabled:
+            return None
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and self.slow_seconds is None:
+            return None
+        active = _ActiveRequest(threading.get_ident(), sampled)
+        with self._lock:
+            self._active[id(active)] = active
+        self._ensure_sampler()
+        self._wakeup.set()
+        return active
+
+    def finish(self, active, method, route, status, stages=None):
+        """Unregister a request and write its profile if it was sampled or turned out slow"""
+        if active is None:
+            return None
+        with self._lock:
+            self._active.pop(id(active), None)
+        duration = time.monotonic() - active.started
+        if not active.stacks:
+            return None
+        trigger = "sampled" if active.sampled else "slow"
+        try:
+            return self._write(active, method, route, status, duration, trigger, stages or {})
+        except OSError as e:
+            logger.error(f"Could not write profile: {e}")
+            return None
+
+    def _ensure_sampler(self):
+        # One sampler per process; a worker forked from a preloaded parent starts its own
+        if self._sampler is not None and self._sampler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sampler is None or self._sampler_pid != os.getpid():
+                self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._sampler_pid = os.getpid()
+                self._sampler.start()
+
+    def _due(self, now):
+        with self._lock:
+            if not self._active:
+                self._wakeup.clear()
+                return None
+            return [
+                active for active in self._active.values()
+                if active.sampled or now - active.started >= self.slow_seconds
+            ]
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            due = self._due(time.monotonic())
+            if not due:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                # Skip requests that finished meanwhile: their profile may be being written
+                for active in due:
+                    frame = frames.get(active.thread_id)
+                    if frame is not None and id(active) in self._active:
+                        active.stacks[collapse_stack(frame)] += 1
+                        active.samples += 1
+            del frames
+
+    def _write(self, active, method, route, status, duration, trigger, stages):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+        slug = ROUTE_SLUG.sub("_", f"{method} {route}").strip("_")
+        base = os.path.join(self.directory, f"{stamp}_{os.getpid()}_{slug}_{trigger}")
+        root = f"{method} {route}"
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in active.stacks.most_common():
+                f.write(f"{root};{stack} {count}\n")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "method": method,
+                "route": route,
+                "status": status,
+                "trigger": trigger,
+                "duration_ms": round(duration * 1000, 1),
+                "interval_ms": self.interval * 1000,
+                "samples": active.samples,
+                "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stages.items()},
+                "pid": os.getpid(),
+            }, f, indent=2)
+        self.written += 1
+        logger.info(f"Wrote {trigger} profile for {root} ({duration * 1000:.0f} ms, {active.samples} samples)")
+        self._rotate()
+        return base + ".folded"
+
+    def _rotate(self):
+        """Delete the oldest profiles beyond the file-count and size budgets"""
+        profiles = {}
+        for entry in os.scandir(self.directory):
+            stem, ext = os.path.splitext(entry.name)
+            if ext in (".folded", ".json") and entry.is_file():
+                size, mtime = profiles.get(stem, (0, 0.0))
+                stat = entry.stat()
+                profiles[stem] = (size + stat.st_size, max(mtime, stat.st_mtime))
+        total = sum(size for size, _ in profiles.values())
+        excess = len(profiles) - self.max_files
+        for stem, (size, _) in sorted(profiles.items(), key=lambda item: (item[1][1], item[0])):
+            if excess <= 0 and total <= self.max_bytes:
+                break
+            for ext in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, stem + ext))
+                except FileNotFoundError:
+                    pass
+            excess -= 1
+            total -= size
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Return the process-wide RequestProfiler configured from the environment"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = RequestProfiler()
+                if _profiler.enabled:
+                    logger.info(
+                        f"Request profiling on: sample rate {_profiler.sample_rate:g}, "
+                        f"slow threshold {PROFILE_SLOW_MS:g} ms, writing to {_profiler.directory}"
+                    )
+    return _profiler
@@ -0,0 +1,236 @@
+# question_search.py
+"""Full-text search over the question bank.
+
+QuestionSearchIndex is an inverted index built once per version of the
+question file. Questions get consecutive document ids in bank order, so
+every role, (role, level) and competency area is a contiguous id range and a
+filter only has to bisect each posting list instead of checking documents
+one by one. Scoring is BM25; a query term ending in ``*`` (and, by default,
+the last term of the query) also matches every indexed term it prefixes,
+found by bisecting the sorted vocabulary.
+"""
+import bisect
+import heapq
+import logging
+import math
+import operator
+import re
+import threading
+from array import array
+
+from granite import get_question_bank
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_TERMS = 50  # expansions of one prefix, in vocabulary order
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def _normalize(name):
+    return name.strip().lower()
+
+
+class QuestionSearchIndex:
+    """BM25 inverted index over (role, level, competency, question) entries"""
+
+    def __init__(self, entries):
+        self.questions = []
+        self._doc_meta = []  # doc id -> (role, level, competency) as given
+        self._lengths = array("H")
+        self._postings = {}  # term -> (array of doc ids, array of term frequencies)
+        self._ranges = {}  # filter key -> [(start, end), ...] doc id ranges
+
+        area = None
+        keys = ()
+        for role, level, competency, question in entries:
+            doc = len(self.questions)
+            self.questions.append(question)
+            if area != (role, level, competency):
+                area = (role, level, competency)
+                self._doc_meta.append((doc, role, level, competency))
+                keys = (
+                    ("role", _normalize(role)),
+                    ("level", _normalize(role), _normalize(level)),
+                    ("competency", _normalize(role), _normalize(level), _normalize(competency)),
+                )
+            for key in keys:
+                self._extend_range(key, doc)
+
+            counts = {}
+            tokens = tokenize(question)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            self._lengths.append(min(len(tokens), 65535))
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("H"))
+                postings[0].append(doc)
+                postings[1].append(min(count, 65535))
+
+        self.size = len(self.questions)
+        self._average_length = (sum(self._lengths) / self.size) if self.size else 0.0
+        self._vocabulary = sorted(self._postings)
+        self._meta_starts = [meta[0] for meta in self._doc_meta]
+        for key, ranges in self._ranges.items():
+            self._ranges[key] = [tuple(r) for r in ranges]
+
+    def _extend_range(self, key, doc):
+        ranges = self._ranges.setdefault(key, [])
+        if ranges and ranges[-1][1] == doc:
+            ranges[-1][1] = doc + 1
+        else:
+            ranges.append([doc, doc + 1])
+
+    @classmethod
+    def from_bank(cls, bank):
+        def entries():
+            seen = set()
+            for role in bank.roles():
+                for level in bank.levels(role):
+                    key = (_normalize(role), _normalize(level))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    questions = bank.questions(role, level)
+                    for competency, start, end, _ in bank.competencies(role, level):
+                        for question in questions[start:end]:
+                            yield role, level, competency, question
+        return cls(entries())
+
+    def describe(self, doc):
+        """(role, level, competency) of a document"""
+        _, role, level, competency = self._doc_meta[bisect.bisect_right(self._meta_starts, doc) - 1]
+        return role, level, competency
+
+    def _filter_ranges(self, role=None, level=None, competency=None):
+        """Doc id ranges matching the filters; None means every document"""
+        if competency:
+            if not (role and level):
+                # Competency names repeat across levels: gather every area with that name
+                wanted = _normalize(competency)
+                ranges = [
+                    r for key, rs in self._ranges.items()
+                    if key[0] == "competency" and key[3] == wanted
+                    and (not role or key[1] == _normalize(role))
+                    and (not level or key[2] == _normalize(level))
+                    for r in rs
+                ]
+                return sorted(ranges)
+            return self._ranges.get(("competency", _normalize(role), _normalize(level), _normalize(competency)), [])
+        if level:
+            if not role:
+                wanted = _normalize(level)
+                return sorted(r for key, rs in self._ranges.items()
+                              if key[0] == "level" and key[2] == wanted for r in rs)
+            return self._ranges.get(("level", _normalize(role), _normalize(level)), [])
+        if role:
+            return self._ranges.get(("role", _normalize(role)), [])
+        return None
+
+    def _expand(self, token, prefix):
+        if not prefix:
+            return [token] if token in self._postings else []
+        terms = []
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, role=None, level=None, competency=None, offset=0, limit=20, prefix_last=True):
+        """Return (total matches, [(doc id, score), ...]) for one page of BM25-ranked results.
+
+        Without query terms every document matching the filters is returned
+        in bank order with a score of 0.
+        """
+        ranges = self._filter_ranges(role, level, competency)
+        raw_terms = query.lower().split()
+        if not raw_terms:
+            return self._browse(ranges, offset, limit)
+
+        # One group of indexed terms per query token; a prefix counts once, for its best expansion
+        groups = []
+        for position, raw in enumerate(raw_terms):
+            starred = raw.endswith("*")
+            tokens = tokenize(raw)
+            for i, token in enumerate(tokens):
+                is_last = i == len(tokens) - 1 and (starred or (prefix_last and position == len(raw_terms) - 1))
+                group = self._expand(token, is_last)
+                if group:
+                    groups.append(group)
+
+        scores = {}
+        for group in groups:
+            if len(group) == 1:
+                self._score_term(group[0], ranges, scores, operator.add)
+                continue
+            best = {}
+            for term in group:
+                self._score_term(term, ranges, best, max)
+            for doc, score in best.items():
+                scores[doc] = scores.get(doc, 0.0) + score
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return len(scores), top[offset:]
+
+    def _score_term(self, term, ranges, scores, combine):
+        """Add (or combine) the BM25 contribution of one term into scores, within the ranges"""
+        docs, frequencies = self._postings[term]
+        k1, b = BM25_K1, BM25_B
+        idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+        length_scale = b / (self._average_length or 1.0)
+        lengths = self._lengths
+        spans = [(0, len(docs))] if ranges is None else [
+            (bisect.bisect_left(docs, start), bisect.bisect_left(docs, end)) for start, end in ranges
+        ]
+        for lo, hi in spans:
+            for i in range(lo, hi):
+                doc = docs[i]
+                tf = frequencies[i]
+                score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + length_scale * lengths[doc]))
+                previous = scores.get(doc)
+                scores[doc] = score if previous is None else combine(previous, score)
+
+    def _browse(self, ranges, offset, limit):
+        if ranges is None:
+            ranges = [(0, self.size)]
+        total = sum(end - start for start, end in ranges)
+        page = []
+        skip = offset
+        for start, end in ranges:
+            if skip >= end - start:
+                skip -= end - start
+                continue
+            for doc in range(start + skip, end):
+                page.append((doc, 0.0))
+                if len(page) == limit:
+                    return total, page
+            skip = 0
+        return total, page
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(filepath="interview_ques.json"):
+    """Return the QuestionSearchIndex for the current version of a question file"""
+    bank = get_question_bank(filepath)
+    digest = bank.digest
+    cached = _indexes.get(filepath)
+    if cached is None or cached[0] != digest:
+        with _indexes_lock:
+            cached = _indexes.get(filepath)
+            if cached is None or cached[0] != digest:
+                index = QuestionSearchIndex.from_bank(bank)
+                logger.info(f"Built search index: {index.size} questions, {len(index._vocabulary)} terms")
+                cached = _indexes[filepath] = (digest, index)
+    return cached[1]
@@ -0,0 +1,251 @@
+# response_parser.py
+"""Parsing of numbered model answers out of Gemini responses.
+
+All patterns are compiled once. A single tokenizer (IncrementalAnswerParser)
+splits the response on its "N." markers and cleans each answer in one sweep;
+batch parsing feeds it the whole text at once and streaming feeds it chunk
+by chunk, so both paths produce the same answers.
+
+The output matches the earlier parser, which cleaned answers with four
+successive substitutions (tests/test_response_parser.py checks this on the
+recorded responses in tests/data). It differs only where removing one
+artifact joins its neighbours into a new one, as in "AI **x**Model Answer"
+or "--**x**-": the successive passes removed the joined label or rule in a
+later step, while the single sweep leaves it in place.
+"""
+import json
+import logging
+import re
+
+from metrics import PARSE_FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+# "1. ", "\n2. " ... start a new answer
+NUMBERED_MARKER = re.compile(r'\n?(\d+)\.\s*')
+# Markdown bold, "AI Model Answer" labels, horizontal rules and newlines are
+# removed in one pass; a run that contained a newline collapses to one space
+ANSWER_ARTIFACTS = re.compile(r'(?:\n|\*\*.*?\*\*|AI Model Answer|---+)+')
+# Fallback parsing: blank-line separated paragraphs
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n+')
+PARAGRAPH_NUMBER = re.compile(r'^\d+\.\s*')
+PARAGRAPH_ARTIFACTS = re.compile(r'\*\*.*?\*\*|AI Model Answer')
+SINGLE_ANSWER_NUMBER = re.compile(r'^\s*\d+\.\s*')
+# Models sometimes wrap JSON in ```json fences despite being told not to
+JSON_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+JSON_ARRAY_START = re.compile(r'\s*\[\s*')
+JSON_ITEM_SEPARATOR = re.compile(r'\s*,\s*')
+JSON_DECODER = json.JSONDecoder()
+
+NO_RESPONSE_ANSWER = "No response generated."
+NOT_AVAILABLE_ANSWER = "Answer not available."
+PARSING_ERROR_ANSWER = "Answer not available due to parsing error."
+
+
+def _replace_artifacts(match):
+    return ' ' if '\n' in match.group() else ''
+
+
+def clean_answer(answer_text):
+    """Strip markdown and label artifacts from one numbered answer.
+
+    Artifacts that only appear once another one is removed are kept (see the module docstring).
+    """
+    return ANSWER_ARTIFACTS.sub(_replace_artifacts, answer_text.strip()).strip()
+
+
+class IncrementalAnswerParser:
+    """Parse numbered answers out of a response that arrives in chunks.
+
+    feed() returns (number, answer) for every answer that is known to be
+    complete, i.e. once the next number has started; close() returns the
+    last one. Numbers are 1-based as they appear in the response.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._current = None  # number of the answer being accumulated
+        self._start = 0
+        self._chunks = []
+
+    @property
+    def text(self):
+        """Everything fed so far, for fallback parsing"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        self._chunks.append(chunk)
+        return self._drain(final=False)
+
+    def close(self):
+        return self._drain(final=True)
+
+    def _drain(self, final):
+        finished = []
+        buffer = self._buffer
+        pos = self._start
+        while True:
+            match = NUMBERED_MARKER.search(buffer, pos)
+            # A marker touching the end of the buffer may still grow ("1" -> "10. ")
+            if not match or (match.end() >= len(buffer) and not final):
+                break
+            if self._current is not None:
+                finished.append((self._current, buffer[self._start:match.start()]))
+            self._current = int(match.group(1))
+            self._start = pos = match.end()
+
+        if final and self._current is not None:
+            finished.append((self._current, buffer[self._start:]))
+            self._current = None
+
+        # Drop the consumed prefix so the buffer only holds the open answer
+        self._buffer = buffer[self._start:]
+        self._start = 0
+
+        results = []
+        for number, text in finished:
+            answer = clean_answer(text)
+            if answer:
+                results.append((number, answer))
+        return results
+
+
+def iter_numbered_answers(response_text):
+    """All (number, answer) pairs of a complete response, in order"""
+    parser = IncrementalAnswerParser()
+    return parser.feed(response_text) + parser.close()
+
+
+def _parse_paragraphs(response_text, questions):
+    """Fallback: assign blank-line separated paragraphs to questions in order"""
+    sections = [s.strip() for s in PARAGRAPH_BREAK.split(response_text) if s.strip()]
+
+    parsed_questions = []
+    for i, question in enumerate(questions):
+        answer = NOT_AVAILABLE_ANSWER
+        if i < len(sections):
+            answer = PARAGRAPH_ARTIFACTS.sub('', PARAGRAPH_NUMBER.sub('', sections[i], count=1)).strip()
+            if not answer:
+                answer = NOT_AVAILABLE_ANSWER
+        parsed_questions.append({"question": question, "answer": answer})
+    return parsed_questions
+
+
+def parse_gemini_response(response_text, questions):
+    """Parse Gemini response and match with questions - improved version"""
+    if not response_text or not response_text.strip():
+        logger.warning("Empty response from Gemini")
+        return [{"question": q, "answer": NO_RESPONSE_ANSWER} for q in questions]
+
+    logger.info(f"Parsing response of length {len(response_text)} for {len(questions)} questions")
+
+    # Clean the response
+    response_text = response_text.strip()
+
+    # Method 1: numbered answers ("1.", "2.", ...) from the shared tokenizer
+    parsed_questions = []
+    numbered = iter_numbered_answers(response_text)
+    if numbered:
+        logger.info(f"Found {len(numbered)} numbered sections")
+    for number, answer_text in numbered:
+        question_num = number - 1  # Convert to 0-based index
+        if question_num < len(questions):
+            parsed_questions.append({
+                "question": questions[question_num],
+                "answer": answer_text
+            })
+
+    # Method 2: If Method 1 didn't work well, try alternative parsing
+    if len(parsed_questions) < len(questions) * 0.8:  # If we got less than 80% of questions
+        logger.warning("Method 1 failed, trying alternative parsing")
+        PARSE_FALLBACKS.inc(parser="numbered", fallback="paragraphs")
+        parsed_questions = _parse_paragraphs(response_text, questions)
+
+    # Method 3: Fallback - ensure we have answers for all questions
+    if len(parsed_questions) != len(questions):
+        logger.warning(f"Mismatch: {len(parsed_questions)} parsed vs {len(questions)} expected")
+        PARSE_FALLBACKS.inc(parser="numbered", fallback="placeholder")
+
+        # Fill missing questions
+        for i in range(len(parsed_questions), len(questions)):
+            parsed_questions.append({
+                "question": questions[i],
+                "answer": PARSING_ERROR_ANSWER
+            })
+
+        # Trim excess if any
+        parsed_questions = parsed_questions[:len(questions)]
+
+    logger.info(f"Successfully parsed {len(parsed_questions)} question-answer pairs")
+    return parsed_questions
+
+
+def _leading_array_items(text):
+    """Decode the complete items at the start of a JSON array that breaks off part-way"""
+    items = []
+    match = JSON_ARRAY_START.match(text)
+    if not match:
+        return items
+    pos = match.end()
+    while True:
+        try:
+            item, pos = JSON_DECODER.raw_decode(text, pos)
+        except ValueError:
+            return items
+        items.append(item)
+        separator = JSON_ITEM_SEPARATOR.match(text, pos)
+        if not separator:
+            return items
+        pos = separator.end()
+
+
+def parse_json_answers(response_text, expected_indexes):
+    """Validate a JSON answer array and return {index: answer} for the usable entries.
+
+    Entries with an unexpected index, a non-string or empty answer, or a
+    duplicate index are dropped, so the caller can re-request only what is
+    missing. Invalid JSON yields an empty dict.
+    """
+    if not response_text:
+        return {}
+    text = JSON_FENCE.sub('', response_text.strip())
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # A response cut off by the token limit still holds its complete leading entries
+        data = _leading_array_items(text)
+        if not data:
+            logger.warning("Response is not valid JSON")
+            PARSE_FALLBACKS.inc(parser="json", fallback="invalid")
+            return {}
+        logger.warning(f"Response is incomplete JSON; salvaged {len(data)} entries")
+        PARSE_FALLBACKS.inc(parser="json", fallback="salvaged")
+
+    if isinstance(data, dict):
+        data = data.get("answers")
+    if not isinstance(data, list):
+        logger.warning("JSON response is not an array of answers")
+        PARSE_FALLBACKS.inc(parser="json", fallback="invalid")
+        return {}
+
+    expected = set(expected_indexes)
+    answers = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        answer = item.get("answer")
+        if type(index) is not int or index not in expected or index in answers:
+            continue
+        if not isinstance(answer, str) or not answer.strip():
+            continue
+        answers[index] = clean_answer(answer)
+    return answers
+
+
+def clean_single_answer(response_text):
+    """Clean a response that answers exactly one question"""
+    if not response_text or not response_text.strip():
+        return ""
+    return clean_answer(SINGLE_ANSWER_NUMBER.sub('', response_text.strip(), count=1))
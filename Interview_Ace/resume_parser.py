@@ -2,68 +2,141 @@
 import fitz  # PyMuPDF
 import re
 import os
+import copy
+import hashlib
+import io
+import socket
+import subprocess
+import sys
+import threading
+from collections import deque
+from multiprocessing.connection import Connection
 from docx import Document
 import logging
+from cache import LRUCache, SQLiteCache, TieredCache
+from metrics import CACHE_REQUESTS, stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_resume_info(file_path):
-    """Extract information from resume file"""
+# Bump when extraction logic changes so persisted parse results are not reused
+RESUME_PARSER_VERSION = 1
+
+# Parse results keyed by the SHA-256 of the file bytes; RESUME_CACHE_PATH adds a SQLite tier
+RESUME_CACHE_SIZE = int(os.getenv("RESUME_CACHE_SIZE", "256"))
+RESUME_CACHE_PATH = os.getenv("RESUME_CACHE_PATH")
+
+# Text extraction runs in isolated worker processes; EXTRACT_WORKERS=0 extracts inline.
+# Workers inherit their socket by descriptor, which Windows can't do, so they are off there by default
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "0" if os.name == "nt" else str(min(4, os.cpu_count() or 1))))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "15"))  # seconds per document
+EXTRACT_MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "1024"))  # address-space cap per worker
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "20"))  # PDF pages read per document
+EXTRACT_MAX_TASKS = int(os.getenv("EXTRACT_MAX_TASKS", "200"))  # documents before a worker is recycled
+
+_parse_cache = TieredCache(
+    LRUCache(RESUME_CACHE_SIZE),
+    SQLiteCache(RESUME_CACHE_PATH, table="resume_parse") if RESUME_CACHE_PATH else None
+)
+
+def resume_cache_key(data, file_ext):
+    """Cache key for a resume's parse result"""
+    return f"v{RESUME_PARSER_VERSION}:{file_ext}:{hashlib.sha256(data).hexdigest()}"
+
+def extract_resume_info(source, filename=None):
+    """Extract information from a resume.
+
+    source is either a file path or the raw file bytes; for bytes, filename
+    supplies the extension used to pick the extractor.
+    """
     try:
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+            file_ext = os.path.splitext(filename or "")[1].lower()
+        else:
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"File not found: {source}")
+            with open(source, "rb") as f:
+                data = f.read()
+            file_ext = os.path.splitext(source)[1].lower()
         
-        # Get file extension
-        file_ext = os.path.splitext(file_path)[1].lower()
+        # Identical uploads skip extraction entirely
+        cache_key = resume_cache_key(data, file_ext)
+        cached = _parse_cache.get(cache_key)
+        CACHE_REQUESTS.inc(cache="resume_parse", result="miss" if cached is None else "hit")
+        if cached is not None:
+            logger.info("Resume parse cache hit")
+            return copy.deepcopy(cached)
         
-        # Extract text based on file type
-        if file_ext == '.pdf':
-            text = extract_text_from_pdf(file_path)
-        elif file_ext in ['.doc', '.docx']:
-            text = extract_text_from_docx(file_path)
-        else:
+        if file_ext not in ('.pdf', '.doc', '.docx'):
             raise ValueError(f"Unsupported file type: {file_ext}")
         
+        # Extract text based on file type, off the request thread when the pool is enabled
+        with stage("extract_text"):
+            if EXTRACT_WORKERS > 0:
+                text = get_extraction_pool().extract(data, file_ext)
+            else:
+                text = extract_text(data, file_ext)
+        
         if not text.strip():
             raise ValueError("No text content found in the resume")
         
         # Extract information
-        email = extract_email(text)
-        name = extract_name(text)
-        skills = extract_skills(text)
-        role = extract_role(text)
-        level = extract_level(text)
+        with stage("extract_fields"):
+            email = extract_email(text)
+            name = extract_name(text)
+            skills = extract_skills(text)
+            role = extract_role(text)
+            level = extract_level(text)
 
-        return {
+        info = {
             "email": email,
             "name": name,
             "skills": skills,
             "role": role,
             "level": level
         }
+        _parse_cache.set(cache_key, copy.deepcopy(info))
+        return info
         
     except Exception as e:
         logger.error(f"Error processing resume: {str(e)}")
         raise
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file"""
+def extract_text(data, file_ext, max_pages=None):
+    """Extract text from resume bytes based on the file extension"""
+    if file_ext == '.pdf':
+        return extract_text_from_pdf(data, max_pages)
+    elif file_ext in ['.doc', '.docx']:
+        return extract_text_from_docx(data)
+    raise ValueError(f"Unsupported file type: {file_ext}")
+
+def extract_text_from_pdf(source, max_pages=None):
+    """Extract text from a PDF file path or PDF bytes, reading at most max_pages pages"""
     try:
         text = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            document = fitz.open(stream=bytes(source), filetype="pdf")
+        else:
+            document = fitz.open(source)
+        with document as doc:
+            for page_number, page in enumerate(doc):
+                if max_pages is not None and page_number >= max_pages:
+                    logger.warning(f"PDF has {doc.page_count} pages; only the first {max_pages} were read")
+                    break
                 text += page.get_text()
         return text
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {str(e)}")
         raise ValueError("Invalid or corrupted PDF file")
 
-def extract_text_from_docx(file_path):
-    """Extract text from DOCX file"""
+def extract_text_from_docx(source):
+    """Extract text from a DOCX file path or DOCX bytes"""
     try:
-        doc = Document(file_path)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        doc = Document(source)
         text = ""
         for paragraph in doc.paragraphs:
             text += paragraph.text + "\n"
@@ -72,6 +145,125 @@ def extract_text_from_docx(file_path):
         logger.error(f"Error extracting text from DOCX: {str(e)}")
         raise ValueError("Invalid or corrupted DOCX file")
 
+# Each worker runs this script, so it never imports the app that started it
+EXTRACTION_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_worker.py")
+
+class _ExtractionWorker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        self.conn.close()
+        if self.alive():
+            self.process.kill()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+
+class ExtractionPool:
+    """Bounded pool of long-lived processes that extract resume text.
+
+    Each document goes to one idle worker. A worker that exceeds the
+    timeout or dies mid-document is killed and replaced without touching
+    the others, and every worker is recycled after max_tasks documents.
+    """
+
+    def __init__(self, workers, timeout, memory_mb, max_pages, max_tasks):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_pages = max_pages
+        self.max_tasks = max_tasks
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _start_worker(self):
+        # A fresh interpreter running extraction_worker.py: the (threaded) web worker is
+        # never forked, and nothing of it is re-imported. The worker exits when its socket closes.
+        parent_sock, child_sock = socket.socketpair()
+        with child_sock:
+            process = subprocess.Popen(
+                [sys.executable, EXTRACTION_WORKER_SCRIPT, str(child_sock.fileno()), str(self.memory_mb)],
+                pass_fds=(child_sock.fileno(),),
+                stdin=subprocess.DEVNULL
+            )
+        return _ExtractionWorker(process, Connection(parent_sock.detach()))
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+                worker.stop()
+        return self._start_worker()
+
+    def _checkin(self, worker):
+        if worker.tasks >= self.max_tasks:
+            worker.stop()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def extract(self, data, file_ext):
+        """Extract text from document bytes in a worker process"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ValueError("Resume processing is busy. Please try again.")
+        worker = None
+        try:
+            worker = self._checkout()
+            try:
+                worker.conn.send((data, file_ext, self.max_pages))
+                if not worker.conn.poll(self.timeout):
+                    raise TimeoutError
+                ok, payload = worker.conn.recv()
+            except TimeoutError:
+                logger.error(f"Resume extraction exceeded {self.timeout}s; recycling worker")
+                worker.stop()
+                worker = None
+                raise ValueError("Resume took too long to process")
+            except (EOFError, OSError) as e:
+                logger.error(f"Resume extraction worker died: {e or 'connection closed'}")
+                worker.stop()
+                worker = None
+                raise ValueError("Resume could not be processed")
+
+            worker.tasks += 1
+            if not ok:
+                raise ValueError(payload)
+            return payload
+        finally:
+            if worker is not None:
+                self._checkin(worker)
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    """Return the process-wide ExtractionPool"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                _extraction_pool = ExtractionPool(
+                    EXTRACT_WORKERS, EXTRACT_TIMEOUT, EXTRACT_MEMORY_MB,
+                    EXTRACT_MAX_PAGES, EXTRACT_MAX_TASKS
+                )
+    return _extraction_pool
+
 def extract_email(text):
     """Extract email address from text"""
     email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
@@ -104,56 +296,128 @@ def extract_name(text):
     
     return "Not found"
 
+# Comprehensive skills list
+SKILLS_KEYWORDS = [
+    # Programming Languages
+    'python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'php', 'ruby', 'go', 'rust',
+    'swift', 'kotlin', 'scala', 'r', 'matlab', 'perl', 'shell', 'bash', 'powershell',
+    
+    # Web Technologies
+    'html', 'css', 'react', 'angular', 'vue', 'nodejs', 'express', 'django', 'flask',
+    'spring', 'laravel', 'bootstrap', 'jquery', 'sass', 'less', 'webpack', 'gulp',
+    
+    # Databases
+    'sql', 'mysql', 'postgresql', 'mongodb', 'redis', 'sqlite', 'oracle', 'cassandra',
+    'elasticsearch', 'dynamodb', 'firebase', 'neo4j',
+    
+    # Cloud & DevOps
+    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'gitlab', 'github',
+    'terraform', 'ansible', 'chef', 'puppet', 'vagrant', 'linux', 'unix', 'ubuntu',
+    'centos', 'nginx', 'apache', 'git', 'svn', 'ci/cd', 'devops',
+    
+    # Data Science & ML
+    'machine learning', 'deep learning', 'artificial intelligence', 'data science',
+    'data analysis', 'statistics', 'pandas', 'numpy', 'scikit-learn', 'tensorflow',
+    'pytorch', 'keras', 'opencv', 'nltk', 'spacy', 'matplotlib', 'seaborn', 'plotly',
+    'tableau', 'power bi', 'excel', 'jupyter', 'anaconda', 'spark', 'hadoop',
+    
+    # Mobile Development
+    'ios', 'android', 'react native', 'flutter', 'xamarin', 'cordova', 'ionic',
+    
+    # Testing
+    'selenium', 'junit', 'pytest', 'jest', 'mocha', 'cypress', 'postman', 'jmeter',
+    'cucumber', 'testng',
+    
+    # Others
+    'agile', 'scrum', 'kanban', 'jira', 'confluence', 'slack', 'teams', 'photoshop',
+    'illustrator', 'figma', 'sketch', 'invision', 'zeplin', 'wireframing', 'prototyping',
+    'ui/ux', 'user experience', 'user interface', 'graphic design', 'web design',
+    'api', 'rest', 'graphql', 'microservices', 'serverless', 'blockchain', 'ethereum',
+    'solidity', 'cybersecurity', 'penetration testing', 'vulnerability assessment'
+]
+
+
+def _is_word_char(char):
+    """Same notion of a word character as the regex \\w class"""
+    return char.isalnum() or char == '_'
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton that finds every keyword in a single pass over the text.
+
+    Matches honour the same word boundaries as wrapping each keyword in
+    ``\\b...\\b``, so multi-word and punctuated skills ("react native",
+    "ci/cd", "c++") behave exactly like the per-keyword regex searches did.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for keyword in keywords:
+            keyword = keyword.lower()
+            node = 0
+            for char in keyword:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                node = child
+            if keyword not in self._output[node]:
+                self._output[node] += (keyword,)
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def find_all(self, text):
+        """Return the set of keywords that occur in text on word boundaries"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        length = len(text)
+        node = 0
+
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+
+            for keyword in output[node]:
+                if keyword in found:
+                    continue
+                start = end - len(keyword) + 1
+                before = _is_word_char(text[start - 1]) if start > 0 else False
+                after = _is_word_char(text[end + 1]) if end + 1 < length else False
+                # \b holds where word-ness changes between neighbouring characters
+                if before != _is_word_char(keyword[0]) and after != _is_word_char(keyword[-1]):
+                    found.add(keyword)
+        return found
+
+
+# Built once at import; matching cost depends on the resume length, not the keyword count
+SKILL_MATCHER = SkillMatcher(SKILLS_KEYWORDS)
+
 def extract_skills(text):
     """Extract skills from text"""
-    # Comprehensive skills list
-    skills_keywords = [
-        # Programming Languages
-        'python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'php', 'ruby', 'go', 'rust',
-        'swift', 'kotlin', 'scala', 'r', 'matlab', 'perl', 'shell', 'bash', 'powershell',
-        
-        # Web Technologies
-        'html', 'css', 'react', 'angular', 'vue', 'nodejs', 'express', 'django', 'flask',
-        'spring', 'laravel', 'bootstrap', 'jquery', 'sass', 'less', 'webpack', 'gulp',
-        
-        # Databases
-        'sql', 'mysql', 'postgresql', 'mongodb', 'redis', 'sqlite', 'oracle', 'cassandra',
-        'elasticsearch', 'dynamodb', 'firebase', 'neo4j',
-        
-        # Cloud & DevOps
-        'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'gitlab', 'github',
-        'terraform', 'ansible', 'chef', 'puppet', 'vagrant', 'linux', 'unix', 'ubuntu',
-        'centos', 'nginx', 'apache', 'git', 'svn', 'ci/cd', 'devops',
-        
-        # Data Science & ML
-        'machine learning', 'deep learning', 'artificial intelligence', 'data science',
-        'data analysis', 'statistics', 'pandas', 'numpy', 'scikit-learn', 'tensorflow',
-        'pytorch', 'keras', 'opencv', 'nltk', 'spacy', 'matplotlib', 'seaborn', 'plotly',
-        'tableau', 'power bi', 'excel', 'jupyter', 'anaconda', 'spark', 'hadoop',
-        
-        # Mobile Development
-        'ios', 'android', 'react native', 'flutter', 'xamarin', 'cordova', 'ionic',
-        
-        # Testing
-        'selenium', 'junit', 'pytest', 'jest', 'mocha', 'cypress', 'postman', 'jmeter',
-        'cucumber', 'testng',
-        
-        # Others
-        'agile', 'scrum', 'kanban', 'jira', 'confluence', 'slack', 'teams', 'photoshop',
-        'illustrator', 'figma', 'sketch', 'invision', 'zeplin', 'wireframing', 'prototyping',
-        'ui/ux', 'user experience', 'user interface', 'graphic design', 'web design',
-        'api', 'rest', 'graphql', 'microservices', 'serverless', 'blockchain', 'ethereum',
-        'solidity', 'cybersecurity', 'penetration testing', 'vulnerability assessment'
-    ]
-    
     found_skills = set()
-    text_lower = text.lower()
     
-    for skill in skills_keywords:
-        # Use word boundaries to avoid partial matches
-        pattern = r'\b' + re.escape(skill.lower()) + r'\b'
-        if re.search(pattern, text_lower):
-            found_skills.add(skill.title() if len(skill.split()) == 1 else skill)
+    for skill in SKILL_MATCHER.find_all(text.lower()):
+        found_skills.add(skill.title() if len(skill.split()) == 1 else skill)
     
     return list(found_skills) if found_skills else ["Not found"]
 
@@ -0,0 +1,121 @@
+# skill_index.py
+"""Relevance of bank questions to a candidate's skills.
+
+The index is a sparse question x skill matrix built once per version of the
+question file: SKILL_MATCHER finds the skills each question mentions, and
+every (question, skill) entry is weighted by the skill's inverse document
+frequency, L2-normalized per question. It is stored per (role, level) both
+as rows (skill weights of each question) and as columns (postings of each
+skill, heaviest first). Ranking multiplies the matrix by the resume's binary
+skill vector, but only as far as needed for the top results: postings are
+read in weight order until no unseen question can still make the cut, so the
+cost tracks the number of results, not the size of the bank.
+"""
+import heapq
+import logging
+import math
+import threading
+
+from granite import get_question_bank
+from resume_parser import SKILL_MATCHER
+
+logger = logging.getLogger(__name__)
+
+
+class SkillIndex:
+    """Sparse question/skill weights for every (role, level) of a question bank"""
+
+    def __init__(self, bank, matcher=SKILL_MATCHER):
+        self.digest = bank.digest
+        self._rows = {}  # (role, level) -> [{skill: weight} or None per question]
+        self._postings = {}  # (role, level) -> {skill: [(weight, question index), ...] heaviest first}
+
+        matches = {}
+        document_frequency = {}
+        total = 0
+        for role in bank.roles():
+            for level in bank.levels(role):
+                key = (role.strip().lower(), level.strip().lower())
+                if key in matches:
+                    continue
+                found = [matcher.find_all(q.lower()) for q in bank.questions(role, level)]
+                matches[key] = found
+                total += len(found)
+                for skills in found:
+                    for skill in skills:
+                        document_frequency[skill] = document_frequency.get(skill, 0) + 1
+
+        idf = {skill: math.log(1 + total / df) for skill, df in document_frequency.items()}
+        for key, found in matches.items():
+            rows = self._rows[key] = [None] * len(found)
+            postings = self._postings[key] = {}
+            for index, skills in enumerate(found):
+                if not skills:
+                    continue
+                norm = math.sqrt(sum(idf[skill] ** 2 for skill in skills))
+                rows[index] = {skill: idf[skill] / norm for skill in skills}
+                for skill, weight in rows[index].items():
+                    postings.setdefault(skill, []).append((weight, index))
+            for plist in postings.values():
+                plist.sort(key=lambda posting: (-posting[0], posting[1]))
+
+        logger.info(f"Built skill index: {total} questions, {len(idf)} skills")
+
+    def rank(self, role, level, skills, limit):
+        """Indexes of up to limit questions relevant to the skills, most relevant first.
+
+        Threshold algorithm: each round reads the next posting of every
+        skill and scores newly seen questions from their rows; once the
+        limit-th best score reaches the sum of the weights just read, no
+        unseen question can beat it.
+        """
+        key = (role.strip().lower(), level.strip().lower())
+        postings = self._postings.get(key, {})
+        query = {s.strip().lower() for s in skills} & postings.keys()
+        if not query or limit <= 0:
+            return []
+        rows = self._rows[key]
+        lists = [postings[skill] for skill in query]
+
+        best = []  # min-heap of (score, -index)
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            advanced = False
+            for plist in lists:
+                if depth >= len(plist):
+                    continue
+                weight, index = plist[depth]
+                threshold += weight
+                advanced = True
+                if index in seen:
+                    continue
+                seen.add(index)
+                row = rows[index]
+                entry = (sum(row.get(skill, 0.0) for skill in query), -index)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+            if not advanced or (len(best) == limit and best[0][0] >= threshold):
+                break
+            depth += 1
+
+        return [-negated for _, negated in sorted(best, reverse=True)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_skill_index(filepath="interview_ques.json"):
+    """Return the SkillIndex for the current version of a question file"""
+    bank = get_question_bank(filepath)
+    index = _indexes.get(filepath)
+    if index is None or index.digest != bank.digest:
+        with _indexes_lock:
+            index = _indexes.get(filepath)
+            if index is None or index.digest != bank.digest:
+                index = _indexes[filepath] = SkillIndex(bank)
+    return index
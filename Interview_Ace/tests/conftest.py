@@ -0,0 +1,12 @@
+# conftest.py
+"""Run the tests against the flat modules next to this directory, on local stand-ins."""
+import os
+import sys
+
+# Set before any app module is imported: they read their settings at import time
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("MONGO_BACKEND", "memory")
+os.environ.setdefault("GEMINI_CACHE_SIZE", "0")
+os.environ.setdefault("ANSWER_STORE_DIR", os.path.join(os.path.dirname(__file__), "no-answer-store"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,173 @@
+# reference_response_parser.py
+"""The response parser as it was before it was rewritten around one tokenizer, kept unchanged.
+
+test_response_parser.py checks the current parser against it on the recorded
+responses in data/gemini_responses.json. Do not modify it to make a test pass.
+"""
+
+def parse_gemini_response(response_text, questions):
+    """Parse Gemini response and match with questions - improved version"""
+    import re
+    import logging
+    
+    logger = logging.getLogger(__name__)
+    
+    if not response_text or not response_text.strip():
+        logger.warning("Empty response from Gemini")
+        return [{"question": q, "answer": "No response generated."} for q in questions]
+    
+    logger.info(f"Parsing response of length {len(response_text)} for {len(questions)} questions")
+    
+    # Clean the response
+    response_text = response_text.strip()
+    
+    # Method 1: Try to parse numbered responses
+    parsed_questions = []
+    
+    # Split by numbered patterns (1., 2., 3., etc.)
+    pattern = r'\n?(\d+)\.\s*'
+    parts = re.split(pattern, response_text)
+    
+    if len(parts) > 2:  # We have numbered sections
+        logger.info(f"Found {(len(parts)-1)//2} numbered sections")
+        
+        for i in range(1, len(parts), 2):
+            if i + 1 < len(parts):
+                question_num = int(parts[i]) - 1  # Convert to 0-based index
+                answer_text = parts[i + 1].strip()
+                
+                # Clean up the answer
+                answer_text = re.sub(r'\*\*.*?\*\*', '', answer_text)  # Remove markdown bold
+                answer_text = re.sub(r'AI Model Answer', '', answer_text)
+                answer_text = re.sub(r'---+', '', answer_text)
+                answer_text = re.sub(r'\n+', ' ', answer_text)  # Replace multiple newlines with space
+                answer_text = answer_text.strip()
+                
+                if question_num < len(questions) and answer_text:
+                    parsed_questions.append({
+                        "question": questions[question_num],
+                        "answer": answer_text
+                    })
+    
+    # Method 2: If Method 1 didn't work well, try alternative parsing
+    if len(parsed_questions) < len(questions) * 0.8:  # If we got less than 80% of questions
+        logger.warning("Method 1 failed, trying alternative parsing")
+        parsed_questions = []
+        
+        # Try splitting by double newlines or other patterns
+        sections = re.split(r'\n\s*\n+', response_text)
+        sections = [s.strip() for s in sections if s.strip()]
+        
+        for i, question in enumerate(questions):
+            if i < len(sections):
+                answer = sections[i]
+                # Clean the answer
+                answer = re.sub(r'^\d+\.\s*', '', answer)  # Remove leading number
+                answer = re.sub(r'\*\*.*?\*\*', '', answer)  # Remove markdown
+                answer = re.sub(r'AI Model Answer', '', answer)
+                answer = answer.strip()
+                
+                if not answer:
+                    answer = "Answer not available."
+            else:
+                answer = "Answer not available."
+            
+            parsed_questions.append({
+                "question": question,
+                "answer": answer
+            })
+    
+    # Method 3: Fallback - ensure we have answers for all questions
+    if len(parsed_questions) != len(questions):
+        logger.warning(f"Mismatch: {len(parsed_questions)} parsed vs {len(questions)} expected")
+        
+        # Fill missing questions
+        for i in range(len(parsed_questions), len(questions)):
+            parsed_questions.append({
+                "question": questions[i],
+                "answer": "Answer not available due to parsing error."
+            })
+        
+        # Trim excess if any
+        parsed_questions = parsed_questions[:len(questions)]
+    
+    logger.info(f"Successfully parsed {len(parsed_questions)} question-answer pairs")
+    return parsed_questions
+
+
+def clean_single_answer(response_text):
+    """Clean a response that answers exactly one question"""
+    import re
+
+    if not response_text or not response_text.strip():
+        return ""
+    answer = re.sub(r'^\s*\d+\.\s*', '', response_text.strip())  # Remove leading number
+    answer = re.sub(r'\*\*.*?\*\*', '', answer)  # Remove markdown bold
+    answer = re.sub(r'AI Model Answer', '', answer)
+    answer = re.sub(r'---+', '', answer)
+    answer = re.sub(r'\n+', ' ', answer)
+    return answer.strip()
+
+
+class IncrementalAnswerParser:
+    """Parse numbered answers out of a response that arrives in chunks.
+
+    feed() yields (number, answer) for every answer that is known to be
+    complete, i.e. once the next number has started; close() yields the last
+    one. Numbers are 1-based as they appear in the response.
+    """
+
+    def __init__(self):
+        import re
+
+        self._marker = re.compile(r'\n?(\d+)\.\s*')
+        self._buffer = ""
+        self._current = None  # number of the answer being accumulated
+        self._start = 0
+        self.text = ""  # everything fed so far, for fallback parsing
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        self.text += chunk
+        return self._drain(final=False)
+
+    def close(self):
+        return self._drain(final=True)
+
+    def _drain(self, final):
+        finished = []
+        pos = self._start
+        while True:
+            match = self._marker.search(self._buffer, pos)
+            # A marker touching the end of the buffer may still grow ("1" -> "10. ")
+            if not match or (match.end() >= len(self._buffer) and not final):
+                break
+            if self._current is not None:
+                finished.append((self._current, self._buffer[self._start:match.start()]))
+            self._current = int(match.group(1))
+            self._start = pos = match.end()
+
+        if final and self._current is not None:
+            finished.append((self._current, self._buffer[self._start:]))
+            self._current = None
+
+        # Drop the consumed prefix so the buffer only holds the open answer
+        self._buffer = self._buffer[self._start:]
+        self._start = 0
+
+        results = []
+        for number, text in finished:
+            answer = _clean_numbered_answer(text)
+            if answer:
+                results.append((number, answer))
+        return results
+
+
+def _clean_numbered_answer(answer_text):
+    import re
+
+    answer_text = re.sub(r'\*\*.*?\*\*', '', answer_text.strip())  # Remove markdown bold
+    answer_text = re.sub(r'AI Model Answer', '', answer_text)
+    answer_text = re.sub(r'---+', '', answer_text)
+    answer_text = re.sub(r'\n+', ' ', answer_text)
+    return answer_text.strip()
@@ -0,0 +1,52 @@
+# test_cache.py
+import sqlite3
+import time
+
+from cache import LRUCache, SQLiteCache, TieredCache
+
+
+def stored_total(path, table="cache"):
+    conn = sqlite3.connect(path)
+    try:
+        return (
+            conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0],
+            conn.execute(f"SELECT total FROM {table}_size").fetchone()[0],
+        )
+    finally:
+        conn.close()
+
+
+def test_size_total_follows_inserts_replacements_evictions_and_clear(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path, max_bytes=500)
+    for i in range(60):
+        cache.set(f"key{i % 25}", "x" * i)
+        summed, total = stored_total(path)
+        assert summed == total <= 500
+
+    # A second handle on the same file shares the stored total instead of counting again
+    SQLiteCache(path, max_bytes=500).set("other", [1, 2, 3])
+    summed, total = stored_total(path)
+    assert summed == total == cache.stats()["bytes"]
+
+    cache.clear()
+    assert stored_total(path) == (0, 0)
+
+
+def test_promotion_keeps_the_persistent_entry_age(tmp_path):
+    persistent = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=0.5)
+    persistent.set("key", "value")
+    time.sleep(0.3)
+
+    tiered = TieredCache(LRUCache(10, ttl=0.5), persistent)
+    assert tiered.get("key") == "value"
+    assert tiered.memory.get("key") == "value"
+    time.sleep(0.25)
+    assert tiered.memory.get("key") is None
+    assert tiered.get("key") is None
+
+
+def test_lru_skips_entries_already_past_their_ttl():
+    cache = LRUCache(10, ttl=1)
+    cache.set("old", "value", created_at=time.time() - 2)
+    assert cache.get("old") is None and len(cache) == 0
@@ -0,0 +1,99 @@
+# test_competency_sampler.py
+import math
+import random
+
+import pytest
+
+from granite import CompetencySampler, get_question_bank
+
+# (start, end, weight): four areas of different sizes and weights, 100 questions in all
+AREAS = [(0, 40, 1.0), (40, 60, 2.0), (60, 90, 0.5), (90, 100, 1.5)]
+
+
+def area_counts(indexes, areas=AREAS):
+    return [sum(start <= i < end for i in indexes) for start, end, _ in areas]
+
+
+def shares(k, areas=AREAS):
+    total = sum(weight for _, _, weight in areas)
+    return [k * weight / total for _, _, weight in areas]
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 7, 10, 13, 20])
+def test_every_area_gets_the_floor_or_ceiling_of_its_share(k):
+    sampler = CompetencySampler(100, AREAS)
+    rng = random.Random(k)
+    for _ in range(500):
+        picked = sampler.sample(k, rng)
+        assert len(picked) == len(set(picked)) == k
+        for count, share in zip(area_counts(picked), shares(k)):
+            assert math.floor(share) <= count <= math.ceil(share)
+
+
+def test_area_counts_are_proportional_on_average():
+    sampler = CompetencySampler(100, AREAS)
+    rng = random.Random(0)
+    draws = 4000
+    totals = [0] * len(AREAS)
+    for _ in range(draws):
+        for area, count in enumerate(area_counts(sampler.sample(7, rng))):
+            totals[area] += count
+    for total, share in zip(totals, shares(7)):
+        assert total / draws == pytest.approx(share, abs=0.05)
+
+
+def test_questions_within_an_area_are_uniform():
+    sampler = CompetencySampler(100, AREAS)
+    rng = random.Random(1)
+    hits = [0] * 10
+    for _ in range(5000):
+        for i in sampler.sample(10, rng):
+            if 90 <= i < 100:
+                hits[i - 90] += 1
+    # The last area gets 3 of 10 per draw, spread over its 10 questions
+    assert min(hits) > 0.8 * 1500 and max(hits) < 1.2 * 1500
+
+
+def test_small_area_overflow_is_topped_up_from_the_rest():
+    areas = [(0, 2, 10.0), (2, 50, 1.0)]
+    sampler = CompetencySampler(50, areas)
+    rng = random.Random(2)
+    for _ in range(200):
+        picked = sampler.sample(10, rng)
+        assert len(picked) == len(set(picked)) == 10
+        assert area_counts(picked, areas)[0] == 2
+
+
+def test_zero_weight_and_empty_areas_are_skipped():
+    areas = [(0, 10, 0.0), (10, 10, 5.0), (10, 30, 1.0)]
+    sampler = CompetencySampler(30, areas)
+    rng = random.Random(3)
+    for _ in range(200):
+        assert all(10 <= i < 30 for i in sampler.sample(5, rng))
+
+
+def test_k_at_least_size_returns_everything_in_order():
+    sampler = CompetencySampler(5, [(0, 5, 1.0)])
+    assert sampler.sample(5) == [0, 1, 2, 3, 4]
+    assert sampler.sample(9) == [0, 1, 2, 3, 4]
+
+
+def test_same_seed_same_sample():
+    sampler = CompetencySampler(100, AREAS)
+    assert sampler.sample(7, random.Random(42)) == sampler.sample(7, random.Random(42))
+
+
+def test_bank_sample_follows_weight_overrides():
+    bank = get_question_bank()
+    role = bank.roles()[0]
+    level = bank.levels(role)[0]
+    competencies = bank.competencies(role, level)
+    assert len(competencies) >= 2
+    favoured = competencies[0][0]
+    weights = {name: (1.0 if name == favoured else 0.0) for name, _, _, _ in competencies}
+    start, end = competencies[0][1], competencies[0][2]
+    expected = set(bank.questions(role, level)[start:end])
+
+    k = min(3, end - start)
+    sample = bank.sample(role, level, k, random.Random(4), weights=weights)
+    assert len(sample) == k and set(sample) <= expected
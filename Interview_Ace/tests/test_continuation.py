@@ -0,0 +1,105 @@
+# test_continuation.py
+import answer_pipeline
+from fake_gemini import extract_numbered_questions
+from gemini_api import GeminiResult
+
+ROLE, LEVEL = "Data Scientist", "Junior"
+QUESTIONS = [f"Question {n} about experiments?" for n in range(1, 8)]
+
+
+def answer(number):
+    return f"Answer to question {number} with a concrete example."
+
+
+def reply(numbers, complete, cut=False):
+    """A numbered response answering the first `complete` numbers; cut adds a half-written next answer"""
+    parts = [f"{n}. {answer(n)}" for n in numbers[:complete]]
+    if cut and complete < len(numbers):
+        parts.append(f"{numbers[complete]}. Half an ans")
+    return GeminiResult("\n\n".join(parts), finish_reason="MAX_TOKENS" if cut else "STOP")
+
+
+def drive(plan, respond):
+    """Run a generation plan against respond(request) -> GeminiResult; returns (answers, requests)"""
+    requests = []
+    try:
+        request = next(plan)
+        while True:
+            requests.append(request)
+            request = plan.send(respond(request))
+    except StopIteration as done:
+        return done.value, requests
+
+
+def requested_numbers(request):
+    return [number for number, _ in extract_numbered_questions(request.prompt)]
+
+
+def test_untruncated_response_needs_one_call():
+    answers, requests = drive(
+        answer_pipeline._batch_plan(ROLE, LEVEL, QUESTIONS),
+        lambda request: reply(requested_numbers(request), 7)
+    )
+    assert len(requests) == 1
+    assert answers == {q: answer(n) for n, q in enumerate(QUESTIONS, 1)}
+
+
+def test_continuation_asks_only_for_unanswered_numbers_and_merges():
+    def respond(request):
+        numbers = requested_numbers(request)
+        if len(numbers) == 7:
+            return reply(numbers, 3, cut=True)  # 1-3 complete, 4 cut off mid-answer
+        return reply(numbers, len(numbers))
+
+    answers, requests = drive(answer_pipeline._batch_plan(ROLE, LEVEL, QUESTIONS), respond)
+    assert [requested_numbers(r) for r in requests] == [list(range(1, 8)), [4, 5, 6, 7]]
+    # Each answer lands on its own question and the half-written one is replaced
+    assert answers == {q: answer(n) for n, q in enumerate(QUESTIONS, 1)}
+
+
+def test_continuations_stop_after_max_continuations(monkeypatch):
+    monkeypatch.setattr(answer_pipeline, "MAX_CONTINUATIONS", 2)
+    answers, requests = drive(
+        answer_pipeline._numbered_plan(ROLE, LEVEL, QUESTIONS),
+        lambda request: reply(requested_numbers(request), 1, cut=True)
+    )
+    assert [requested_numbers(r) for r in requests] == [
+        [1, 2, 3, 4, 5, 6, 7], [2, 3, 4, 5, 6, 7], [3, 4, 5, 6, 7]
+    ]
+    assert answers == {QUESTIONS[0]: answer(1), QUESTIONS[1]: answer(2), QUESTIONS[2]: answer(3)}
+
+
+def test_continuation_ignores_numbers_it_did_not_ask_for():
+    def respond(request):
+        numbers = requested_numbers(request)
+        if len(numbers) == 7:
+            return reply(numbers, 5, cut=True)
+        # Repeats answer 1 with different text and answers the two pending ones
+        return GeminiResult(f"1. Rewritten first answer.\n\n6. {answer(6)}\n\n7. {answer(7)}", finish_reason="STOP")
+
+    answers, _ = drive(answer_pipeline._numbered_plan(ROLE, LEVEL, QUESTIONS), respond)
+    assert answers[QUESTIONS[0]] == answer(1)
+    assert answers == {q: answer(n) for n, q in enumerate(QUESTIONS, 1)}
+
+
+def test_numbered_plan_drops_a_cut_off_last_answer():
+    def respond(request):
+        numbers = requested_numbers(request)
+        # 1-6 complete and 7 cut off; the continuation for 7 is cut off again
+        return reply(numbers, 6 if len(numbers) == 7 else 0, cut=True)
+
+    answers, _ = drive(answer_pipeline._numbered_plan(ROLE, LEVEL, QUESTIONS), respond)
+    assert QUESTIONS[6] not in answers
+    assert answers == {q: answer(n) for n, q in enumerate(QUESTIONS[:6], 1)}
+
+
+def test_repeated_continuation_prompt_bypasses_the_cache(monkeypatch):
+    monkeypatch.setattr(answer_pipeline, "MAX_CONTINUATIONS", 3)
+    answers, requests = drive(
+        answer_pipeline._numbered_plan(ROLE, LEVEL, QUESTIONS[:2]),
+        lambda request: reply(requested_numbers(request), 0, cut=True)
+    )
+    assert answers == {}
+    continuations = requests[1:]
+    assert [r.bypass_cache for r in continuations] == [False, True, True]
+    assert len({r.prompt for r in continuations}) == 1
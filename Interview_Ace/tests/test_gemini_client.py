@@ -0,0 +1,151 @@
+# test_gemini_client.py
+import threading
+import time
+
+import pytest
+
+import gemini_api
+from gemini_api import (
+    CircuitBreaker,
+    GeminiClient,
+    GeminiTimeoutError,
+    GeminiUnavailableError
+)
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=0.1)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.12)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+
+
+def test_trial_success_closes_and_trial_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_release_frees_the_trial_without_closing():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+def client(**overrides):
+    settings = dict(timeout=0.1, deadline=5, max_retries=2, backoff_base=0.001, backoff_max=0.001,
+                    breaker=CircuitBreaker(100, 1))
+    settings.update(overrides)
+    return GeminiClient(**settings)
+
+
+def test_transient_errors_are_retried():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert client()._call(flaky) == "ok"
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried_and_leave_the_breaker_alone():
+    attempts = []
+
+    def bad_request():
+        attempts.append(1)
+        raise ValueError("invalid argument")
+
+    c = client(breaker=CircuitBreaker(100, 1))
+    with pytest.raises(ValueError):
+        c._call(bad_request)
+    assert len(attempts) == 1
+    assert c.breaker.state == "closed"
+
+
+def test_a_started_attempt_that_times_out_is_not_retried():
+    attempts = []
+    release = threading.Event()
+
+    def stalled():
+        attempts.append(1)
+        release.wait(2)
+
+    with pytest.raises(GeminiTimeoutError):
+        client()._call(stalled)
+    release.set()
+    assert len(attempts) == 1
+
+
+def test_calls_fail_fast_once_stalled_attempts_hold_every_slot():
+    c = client()
+    release = threading.Event()
+    slots = gemini_api.GEMINI_MAX_CONCURRENCY * 2
+    started = threading.Barrier(slots + 1)
+
+    def stalled():
+        started.wait()
+        release.wait(5)
+
+    for _ in range(slots):
+        c._submit(stalled)
+    started.wait()
+    try:
+        began = time.monotonic()
+        with pytest.raises(GeminiUnavailableError):
+            c._call(lambda: "never runs")
+        assert time.monotonic() - began < 0.05
+    finally:
+        release.set()
+    # Slots come back once the stalled attempts finish
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            assert c._call(lambda: "ok") == "ok"
+            break
+        except GeminiUnavailableError:
+            time.sleep(0.01)
+    else:
+        pytest.fail("slots were not released")
+
+
+def test_stream_fails_when_a_later_chunk_stalls():
+    c = client()
+
+    class Model:
+        def generate_content(self, prompt, stream=False):
+            def chunks():
+                yield "first"
+                yield "second"
+                time.sleep(1)
+                yield "never"
+            return chunks()
+
+    c._model, c._model_backend = Model(), gemini_api.GEMINI_BACKEND
+    received = []
+    with pytest.raises(GeminiTimeoutError):
+        for chunk in c.stream("prompt"):
+            received.append(chunk)
+    assert received == ["first", "second"]
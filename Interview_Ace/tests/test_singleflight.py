@@ -0,0 +1,119 @@
+# test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+import gemini_api
+from gemini_api import AsyncSingleFlight, SingleFlight
+
+
+def run_together(count, target):
+    """Start count threads on target at once and wait for them"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = run_together(8, lambda: flight.do("key", slow))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"executed": 1, "collapsed": 7, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_nothing_is_remembered():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    results = run_together(4, lambda: flight.do("key", failing))
+    assert all(isinstance(result, ValueError) for result in results)
+    # Finished calls are not cached: the next call runs again
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    results = run_together(4, lambda: flight.do(threading.get_ident(), threading.get_ident))
+    assert len(set(results)) == 4
+    assert flight.stats()["executed"] == 4
+
+
+def test_async_waiters_share_a_task_and_survive_a_cancelled_one():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", slow))
+        others = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.gather(*others), first
+
+    results, first = asyncio.run(main())
+    assert results == ["done"] * 3
+    assert first.cancelled()
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def counted_upstream(monkeypatch):
+    """Count the calls that reach the fake model, each taking 200 ms"""
+    from fake_gemini import FakeGenerativeModel
+
+    calls = []
+    generate = FakeGenerativeModel.generate_content
+
+    def counting(self, prompt, stream=False, generation_config=None):
+        calls.append(prompt)
+        time.sleep(0.2)
+        return generate(self, prompt, stream, generation_config)
+
+    monkeypatch.setattr(FakeGenerativeModel, "generate_content", counting)
+    monkeypatch.setattr(gemini_api, "_response_cache", None)
+    monkeypatch.setattr(gemini_api, "GEMINI_COALESCE", True)
+    return calls
+
+
+def test_identical_prompts_make_one_upstream_call(counted_upstream):
+    prompt = "1. What is a p-value?\n\nRESPONSE FORMAT:\n1. answer"
+    results = run_together(6, lambda: gemini_api.get_gemini_result(prompt).text)
+    assert len(counted_upstream) == 1
+    assert len(set(results)) == 1
+
+
+def test_coalescing_can_be_switched_off(counted_upstream, monkeypatch):
+    monkeypatch.setattr(gemini_api, "GEMINI_COALESCE", False)
+    prompt = "1. What is a confidence interval?\n\nRESPONSE FORMAT:\n1. answer"
+    run_together(3, lambda: gemini_api.get_gemini_result(prompt))
+    assert len(counted_upstream) == 3
@@ -0,0 +1,75 @@
+# test_skill_matcher.py
+import random
+import re
+
+import pytest
+
+from granite import get_question_bank
+from resume_parser import SKILL_MATCHER, SKILLS_KEYWORDS, SkillMatcher, extract_skills
+
+# Text around keywords: word characters, punctuation that keywords contain, separators
+FILLER = ["", " ", "  ", "\n", ",", ".", "/", "-", "_", "+", "#", "(", ")", "a", "x1", "é", "data", "++"]
+
+
+def regex_skills(text):
+    """The matching extract_skills did before the automaton: one \\b...\\b search per keyword"""
+    return {skill for skill in SKILLS_KEYWORDS if re.search(r'\b' + re.escape(skill.lower()) + r'\b', text)}
+
+
+def keyword_soup(rng):
+    parts = []
+    for _ in range(rng.randint(1, 12)):
+        parts.append(rng.choice(FILLER))
+        keyword = rng.choice(SKILLS_KEYWORDS)
+        # Sometimes only part of a keyword, to exercise partial and overlapping matches
+        if rng.random() < 0.2:
+            keyword = keyword[:rng.randint(1, len(keyword))]
+        parts.append(keyword)
+    parts.append(rng.choice(FILLER))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_regex_on_keyword_soups(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        text = keyword_soup(rng)
+        assert SKILL_MATCHER.find_all(text) == regex_skills(text), text
+
+
+def test_matches_regex_on_question_bank():
+    bank = get_question_bank()
+    text = "\n".join(
+        question
+        for role in bank.roles()
+        for level in bank.levels(role)
+        for question in bank.questions(role, level)
+    ).lower()
+    assert SKILL_MATCHER.find_all(text) == regex_skills(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # \b after a trailing symbol needs a word character next, exactly as the regex did
+    ("c++ and c# developer", set()),
+    ("c++17 and c#6", {"c++", "c#"}),
+    ("react native apps, not reactive ones", {"react", "react native"}),
+    ("ci/cd pipelines", {"ci/cd"}),
+    ("golang is not go", {"go"}),
+    ("node.js and nodejs", {"nodejs"}),
+    ("r_programming", set()),
+])
+def test_word_boundaries(text, expected):
+    assert SKILL_MATCHER.find_all(text) == expected == regex_skills(text)
+
+
+def test_overlapping_keywords_are_all_found():
+    matcher = SkillMatcher(["he", "she", "hers", "his"])
+    assert matcher.find_all("ushers") == set()
+    assert matcher.find_all("she hers his") == {"she", "hers", "his"}
+    assert matcher.find_all("he, she") == {"he", "she"}
+
+
+def test_extract_skills_formats_names():
+    skills = extract_skills("Python, machine learning and SQL")
+    assert sorted(skills) == ["Python", "Sql", "machine learning"]
+    assert extract_skills("no keywords here") == ["Not found"]